@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark de paginação de GET /api/v1/locations: OFFSET vs cursor (keyset)
+
+Mede a latência de páginas cada vez mais profundas nos dois modos do
+location_listing.py. No modo offset o banco percorre e descarta todas as
+linhas anteriores; no modo cursor a página começa num seek do índice
+(campo, id), então a latência deve ficar constante.
+
+Uso:
+    python generate_large_dataset.py --scale 1 --rows audit_log=0 location_photos=0 --output cinema_erp_1m.db
+    python benchmark_location_pagination.py --database-url sqlite:///cinema_erp_1m.db
+    python benchmark_location_pagination.py --sort price_day_cinema --depths 0 1000 100000 900000
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from location_listing import LIST_COLUMNS, encode_cursor, list_locations, order_clause, parse_sort, setup_listing_indexes
+
+DEFAULT_DEPTHS = [0, 1000, 10000, 100000, 500000]
+
+
+def timed(fn, repeat: int) -> float:
+    """Mediana em ms de `repeat` execuções"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def cursor_at(db, sort: str, depth: int):
+    """Cursor que o cliente teria recebido ao chegar em `depth` (fora da medição)"""
+    if depth == 0:
+        return None
+    field, descending = parse_sort(sort)
+    row = db.execute(
+        text(f"SELECT l.{field}, l.id FROM locations l ORDER BY {order_clause(db, field, descending)} LIMIT 1 OFFSET :offset"),
+        {"offset": depth - 1},
+    ).first()
+    return encode_cursor(sort, row[0], row[1]) if row else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de paginação OFFSET vs cursor")
+    parser.add_argument('--database-url', default='sqlite:///cinema_erp_large.db')
+    parser.add_argument('--sort', default='-created_at')
+    parser.add_argument('--page-size', type=int, default=24)
+    parser.add_argument('--depths', type=int, nargs='+', default=DEFAULT_DEPTHS)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--skip-setup', action='store_true', help="Não criar os índices (campo, id)")
+    parser.add_argument('--output', help="Salvar relatório JSON")
+    args = parser.parse_args()
+
+    db = Session(create_engine(args.database_url))
+    total_locations = db.execute(text("SELECT COUNT(*) FROM locations")).scalar()
+
+    print("📄 Benchmark de paginação de locações")
+    print(f"   Base: {args.database_url} | Locações: {total_locations} | sort={args.sort} | página={args.page_size}")
+    print("=" * 60)
+
+    if not args.skip_setup:
+        start = time.perf_counter()
+        setup_listing_indexes(db)
+        print(f"🗂️  Índices (campo, id) prontos em {time.perf_counter() - start:.1f}s")
+
+    print(f"\n   {'profundidade':>12} | {'offset (ms)':>11} | {'cursor (ms)':>11}")
+    report = []
+    for depth in [d for d in args.depths if d < total_locations]:
+        cursor = cursor_at(db, args.sort, depth)
+        # Modo offset sem o COUNT(*): mede só o custo de chegar à página
+        offset_ms = timed(lambda: db.execute(
+            text(f"SELECT {LIST_COLUMNS} FROM locations l ORDER BY {order_clause(db, *parse_sort(args.sort))} "
+                 "LIMIT :limit OFFSET :offset"),
+            {"limit": args.page_size, "offset": depth},
+        ).all(), args.repeat)
+        cursor_ms = timed(lambda: list_locations(db, limit=args.page_size, sort=args.sort, cursor=cursor), args.repeat)
+        # Profundidade 0 = primeira página, que ainda não tem cursor e inclui o COUNT(*)
+        report.append({'depth': depth, 'offset_ms': round(offset_ms, 2), 'cursor_ms': round(cursor_ms, 2)})
+        print(f"   {depth:>12} | {offset_ms:>11.1f} | {cursor_ms:>11.1f}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'database_url': args.database_url, 'sort': args.sort, 'page_size': args.page_size,
+                       'locations': total_locations, 'results': report}, f, indent=2, ensure_ascii=False)
+        print(f"\n📄 Relatório salvo em: {args.output}")
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark de latência da busca de locações (/api/v1/locations/search)
+
+Cria os índices de busca na base informada (FTS5 + R*Tree no SQLite,
+tsvector + GIN e PostGIS GiST no PostgreSQL) e mede p50/p95/p99 de consultas
+com termos completos, prefixos digitados parcialmente, acentos e filtros de
+cidade/status (--mode text) ou de raio/caixa com diária e capacidade
+(--mode geo). --mode facets mede as contagens por faceta de conjuntos de
+resultados grandes (bitmaps do location_facets.py) contra um GROUP BY por
+faceta.
+
+Uso:
+    python generate_large_dataset.py --scale 1 --rows audit_log=0 location_photos=0 --output cinema_erp_1m.db
+    python benchmark_location_search.py --database-url sqlite:///cinema_erp_1m.db --queries 2000
+    python benchmark_location_search.py --database-url sqlite:///cinema_erp_1m.db --mode geo --skip-setup
+    python benchmark_location_search.py --database-url sqlite:///cinema_erp_1m.db --mode facets --skip-setup
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from location_facets import FACET_FIELDS, facet_index, search_facets
+from location_search import matching_ids_query, search_locations, setup_search_index
+
+TERMS = [
+    'casa', 'galpão', 'estúdio', 'loft', 'cobertura', 'fazenda', 'praia', 'restaurante', 'escritório',
+    'mansão', 'igreja', 'fábrica', 'hotel', 'terraço', 'moderno', 'colonial', 'industrial', 'rústico',
+    'copacabana', 'pinheiros', 'savassi', 'moinhos', 'centro',
+]
+CITIES = ['São Paulo', 'Rio de Janeiro', 'Porto Alegre', 'Curitiba', 'Salvador']
+STATUSES = ['APPROVED', 'DRAFT']
+
+# Centros (lat, lng) das cidades com mais locações no generate_large_dataset.py
+GEO_CENTERS = [(-23.5505, -46.6333), (-22.9068, -43.1729), (-15.7939, -47.8828), (-19.9167, -43.9345)]
+
+
+def random_query(rng: random.Random) -> dict:
+    words = rng.sample(TERMS, rng.choice([1, 1, 2, 2, 3]))
+    if rng.random() < 0.3:
+        # Usuário ainda digitando: último termo incompleto e sem acento
+        words[-1] = words[-1][:max(2, len(words[-1]) // 2)]
+    params = {'q': ' '.join(words)}
+    if rng.random() < 0.3:
+        params['city'] = rng.choice(CITIES)
+    if rng.random() < 0.2:
+        params['status'] = rng.choice(STATUSES)
+    return params
+
+
+def random_geo_query(rng: random.Random) -> dict:
+    lat, lng = rng.choice(GEO_CENTERS)
+    lat, lng = lat + rng.gauss(0, 0.05), lng + rng.gauss(0, 0.05)
+    if rng.random() < 0.2:
+        # Mapa: caixa visível na tela, sem centro
+        half = rng.choice([0.01, 0.03, 0.1])
+        params = {'bbox': (lng - half, lat - half, lng + half, lat + half)}
+    else:
+        params = {'lat': lat, 'lng': lng, 'radius_km': rng.choice([1, 2, 5, 10, 25])}
+    if rng.random() < 0.5:
+        params['max_price'] = rng.choice([1500, 3000, 6000])
+    if rng.random() < 0.3:
+        params['min_price'] = rng.choice([500, 1000])
+    if rng.random() < 0.5:
+        params['min_capacity'] = rng.choice([20, 50, 100, 200])
+    return params
+
+
+def random_facet_query(rng: random.Random) -> dict:
+    # Filtros amplos: dezenas de milhares a todas as locações no resultado
+    return rng.choice([
+        {},
+        {'status': rng.choice(STATUSES)},
+        {'city': rng.choice(CITIES)},
+        {'q': rng.choice(['casa', 'restaurante', 'galpão', 'estacionamento'])},
+        {'q': rng.choice(['casa', 'hotel']), 'status': rng.choice(STATUSES)},
+        {'max_price': rng.choice([2000, 5000])},
+        {'min_capacity': rng.choice([20, 50])},
+    ])
+
+
+def group_by_facets(db, params: dict) -> dict:
+    """
+    Abordagem ingênua: um COUNT ... GROUP BY por faceta sobre o mesmo conjunto de resultados
+    """
+    sql, sql_params = matching_ids_query(db, **params)
+    facets = {}
+    for field in FACET_FIELDS:
+        facets[field] = db.execute(
+            text(f"SELECT {field}, COUNT(*) FROM locations WHERE id IN ({sql}) GROUP BY {field}"), sql_params
+        ).all()
+    facets['tag'] = db.execute(
+        text(f"SELECT tag_id, COUNT(DISTINCT location_id) FROM location_tags WHERE location_id IN ({sql}) GROUP BY tag_id"),
+        sql_params,
+    ).all()
+    return facets
+
+
+def percentile(values: list, p: float) -> float:
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da busca textual de locações")
+    parser.add_argument('--database-url', default='sqlite:///cinema_erp_large.db')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--mode', choices=['text', 'geo', 'facets'], default='text', help="Busca textual, geográfica ou facetas")
+    parser.add_argument('--baseline', type=int, default=10, help="Consultas comparadas com GROUP BY (modo facets)")
+    parser.add_argument('--skip-setup', action='store_true', help="Não recriar o índice de busca")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    db = Session(create_engine(args.database_url))
+    total_locations = db.connection().exec_driver_sql("SELECT COUNT(*) FROM locations").scalar()
+
+    print("⏱️ Benchmark de busca de locações")
+    print(f"   Base: {args.database_url} | Locações: {total_locations} | Modo: {args.mode}")
+    print("=" * 60)
+
+    if not args.skip_setup:
+        start = time.perf_counter()
+        setup_search_index(db)
+        print(f"🗂️  Índice construído em {time.perf_counter() - start:.1f}s")
+
+    if args.mode == 'facets':
+        start = time.perf_counter()
+        facet_index.build(db)
+        print(f"🧮 Bitmaps de facetas construídos em {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(args.seed)
+    latencies, hits, results, baseline, paired = [], 0, [], [], []
+    for index in range(args.queries):
+        if args.mode == 'facets':
+            params = random_facet_query(rng)
+            start = time.perf_counter()
+            facets = search_facets(db, **params)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append(sum(facets['sector_type'].values()))
+            hits += results[-1] > 0
+            if index < args.baseline:
+                paired.append(latencies[-1])
+                start = time.perf_counter()
+                group_by_facets(db, params)
+                baseline.append((time.perf_counter() - start) * 1000)
+            continue
+        params = random_geo_query(rng) if args.mode == 'geo' else random_query(rng)
+        start = time.perf_counter()
+        result = search_locations(db, **params)
+        latencies.append((time.perf_counter() - start) * 1000)
+        hits += result['total'] > 0
+
+    latencies.sort()
+    print(f"\n   Consultas: {args.queries} ({hits} com resultados)")
+    print(f"   p50: {percentile(latencies, 0.50):.1f} ms")
+    print(f"   p95: {percentile(latencies, 0.95):.1f} ms")
+    print(f"   p99: {percentile(latencies, 0.99):.1f} ms")
+    print(f"   média: {statistics.mean(latencies):.1f} ms")
+    if results:
+        print(f"   resultados por consulta: mediana {statistics.median(results):.0f}, máximo {max(results)}")
+    if baseline:
+        print(f"\n   Mesmas {len(baseline)} consultas: bitmaps {statistics.mean(paired):.1f} ms "
+              f"vs GROUP BY por faceta {statistics.mean(baseline):.1f} ms (média)")
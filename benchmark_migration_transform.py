@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark da conversão de registros SQLite → Firestore
+
+Compara o custo por registro da implementação antiga de
+prepare_data_for_firestore (percorre todos os campos JSON/timestamp em cada
+registro) com os transformadores compilados por tabela, usando registros
+sintéticos gerados a partir de sqlite_structure_analysis.json.
+
+Uso:
+    python benchmark_migration_transform.py --rows 1000000
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+
+from migrate_to_firestore import (
+    JSON_FIELDS,
+    TIMESTAMP_FIELDS,
+    compile_row_transformer,
+    json_loads,
+)
+
+DEFAULT_TABLES = ['locations', 'location_photos', 'audit_log', 'agenda_events']
+
+
+def legacy_prepare(data: dict, table_name: str):
+    """Implementação original de prepare_data_for_firestore (referência)"""
+    for field in JSON_FIELDS:
+        if field in data and data[field]:
+            try:
+                if isinstance(data[field], str):
+                    data[field] = json.loads(data[field])
+            except json.JSONDecodeError:
+                data[field] = {}
+
+    for field in TIMESTAMP_FIELDS:
+        if field in data and data[field]:
+            try:
+                if isinstance(data[field], str):
+                    data[field] = datetime.fromisoformat(data[field].replace('Z', '+00:00'))
+            except ValueError:
+                pass
+
+    if table_name == 'users':
+        if 'password_hash' in data:
+            del data['password_hash']
+    elif table_name == 'locations':
+        if 'photos' in data and isinstance(data['photos'], str):
+            try:
+                data['photos'] = json.loads(data['photos'])
+            except:
+                data['photos'] = []
+
+    doc_id = None
+    if 'id' in data:
+        doc_id = str(data['id'])
+        del data['id']
+
+    return data, doc_id
+
+
+def sample_value(column: dict, index: int):
+    """Gerar um valor sintético plausível para o tipo da coluna"""
+    column_type = (column['type'] or '').upper()
+    if column['name'] == 'id':
+        return index
+    if column_type == 'JSON':
+        return json.dumps({'camera': 'Canon EOS R5', 'iso': 400, 'tags': ['externa', 'dia'], 'score': 4.5})
+    if column_type == 'DATETIME':
+        return '2024-05-17 14:32:10.123456'
+    if column_type == 'DATE':
+        return '2024-05-17'
+    if column_type == 'INTEGER':
+        return index % 1000
+    if column_type == 'FLOAT':
+        return 1500.0
+    if column_type == 'BOOLEAN':
+        return 1
+    return 'Texto de exemplo para a coluna'
+
+
+def measure(function, template: dict, table_name: str, rows: int) -> float:
+    """Tempo total para converter `rows` cópias do registro modelo"""
+    start = time.perf_counter()
+    for _ in range(rows):
+        function(dict(template), table_name)
+    return time.perf_counter() - start
+
+
+def run_benchmark(rows: int, tables: list, structure_path: str = 'sqlite_structure_analysis.json') -> dict:
+    with open(structure_path, 'r', encoding='utf-8') as f:
+        structure = json.load(f)
+
+    print("⏱️ Benchmark de conversão SQLite → Firestore")
+    print(f"   Decoder JSON: {json_loads.__module__}")
+    print(f"   Registros por tabela: {rows}")
+    print("=" * 60)
+
+    results = {}
+
+    for table_name in tables:
+        columns = structure[table_name]['columns']
+        template = {column['name']: sample_value(column, 1) for column in columns}
+
+        transformer = compile_row_transformer(table_name, template.keys())
+
+        # Custo de copiar o registro, descontado das duas medições
+        baseline = measure(lambda data, _: data, template, table_name, rows)
+        legacy = measure(legacy_prepare, template, table_name, rows) - baseline
+        compiled = measure(lambda data, _: transformer(data), template, table_name, rows) - baseline
+
+        legacy_us = legacy / rows * 1e6
+        compiled_us = compiled / rows * 1e6
+        speedup = legacy / compiled if compiled > 0 else float('inf')
+
+        results[table_name] = {
+            'columns': len(columns),
+            'legacy_us_per_row': legacy_us,
+            'compiled_us_per_row': compiled_us,
+            'speedup': speedup
+        }
+
+        print(f"\n🗂️  {table_name} ({len(columns)} colunas)")
+        print(f"   Antes:  {legacy_us:.2f} µs/registro ({legacy:.2f}s)")
+        print(f"   Depois: {compiled_us:.2f} µs/registro ({compiled:.2f}s)")
+        print(f"   🚀 {speedup:.2f}x mais rápido")
+
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da conversão de registros para Firestore")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="Registros sintéticos por tabela")
+    parser.add_argument('--tables', nargs='+', default=DEFAULT_TABLES, help="Tabelas a medir")
+    args = parser.parse_args()
+
+    run_benchmark(args.rows, args.tables)
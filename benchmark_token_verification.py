@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark de security.verify_token com e sem o cache de tokens verificados
+
+Simula requisições autenticadas de um conjunto de usuários ativos (cada um
+reutilizando o próprio token, como o frontend faz em /api/v1/auth/me e nas
+listagens) e mede verificações por segundo.
+
+Uso:
+    python benchmark_token_verification.py --requests 200000 --users 500
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+# Adicionar backend ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from app.core import security
+
+
+def measure(tokens: list, requests: int, seed: int) -> float:
+    """Verificações por segundo para `requests` tokens sorteados"""
+    rng = random.Random(seed)
+    workload = [rng.choice(tokens) for _ in range(requests)]
+    start = time.perf_counter()
+    for token in workload:
+        if security.verify_token(token) is None:
+            raise RuntimeError("Token inválido no benchmark")
+    return requests / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de verificação de tokens JWT")
+    parser.add_argument('--requests', type=int, default=200_000, help="Verificações por modo")
+    parser.add_argument('--users', type=int, default=500, help="Usuários ativos (tokens distintos)")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    tokens = [security.create_access_token(f"usuario{i}@cinemaerp.com.br") for i in range(args.users)]
+
+    print("⏱️ Benchmark verify_token")
+    print(f"   Backend JWT: {'PyJWT' if security.pyjwt else 'python-jose'}")
+    print(f"   Requisições: {args.requests} | Tokens distintos: {args.users}")
+    print("=" * 60)
+
+    cache_size = security.token_cache.max_size
+    security.token_cache.max_size = 0
+    security.token_cache.clear()
+    without_cache = measure(tokens, args.requests, args.seed)
+    print(f"   Sem cache: {without_cache:.0f} verificações/s")
+
+    security.token_cache.max_size = cache_size or 10000
+    with_cache = measure(tokens, args.requests, args.seed)
+    print(f"   Com cache: {with_cache:.0f} verificações/s")
+
+    print(f"\n🚀 {with_cache / without_cache:.1f}x mais rápido com cache")
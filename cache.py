@@ -0,0 +1,417 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, Optional
+
+from .config import settings
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # Cache funciona apenas em memória sem o pacote redis
+    redis = None
+    aioredis = None
+
+logger = logging.getLogger(__name__)
+
+MISS = object()
+
+# Tags invalidadas quando uma linha da tabela muda
+TABLE_TAGS = {
+    "locations": ("locations",),
+    "location_tags": ("locations",),
+    "location_photos": ("locations",),
+    "tags": ("tags", "locations"),
+    "suppliers": ("suppliers", "locations"),
+}
+
+# Namespaces de cache dos endpoints e as tags de que dependem
+CACHE_NAMESPACES = {
+    "locations:list": ("locations", "tags", "suppliers"),
+    "locations:search": ("locations", "tags", "suppliers"),
+    "tags:list": ("tags",),
+    "suppliers:list": ("suppliers",),
+}
+
+
+class LRUCache:
+    """
+    Cache em memória com TTL e limite de itens (fallback quando o Redis cai)
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        self._data = OrderedDict()
+
+    def get(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return MISS
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return MISS
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: int):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+
+# Parâmetros que são conjuntos: a ordem dos valores não muda a resposta
+SET_PARAMS = frozenset({"include", "fields", "tags"})
+
+
+def normalize_params(params: dict, set_params: Iterable[str] = SET_PARAMS) -> str:
+    """
+    Representação canônica dos parâmetros de consulta: ignora None e a ordem
+    das chaves; só os parâmetros em `set_params` têm os valores ordenados
+    (include=tags,photos == photos,tags). Os demais (bbox, q...) ficam como vieram.
+    """
+    normalized = {}
+    for name, value in params.items():
+        if value is None or value == "":
+            continue
+        if name in set_params:
+            parts = value.split(",") if isinstance(value, str) else value
+            value = sorted({str(part).strip() for part in parts if str(part).strip()})
+        elif isinstance(value, (list, tuple)):
+            value = [str(part) for part in value]
+        elif isinstance(value, set):
+            value = sorted(str(part) for part in value)
+        elif isinstance(value, str):
+            value = value.strip()
+        normalized[name] = value
+    return json.dumps(normalized, sort_keys=True, default=str, ensure_ascii=False)
+
+
+def user_scope(user) -> str:
+    """
+    Identidade do usuário na chave do cache (respostas filtradas por permissão)
+    """
+    identity = user.get("id") or user.get("uid") if isinstance(user, dict) else getattr(user, "id", None)
+    return str(identity) if identity is not None else repr(user)
+
+
+class QueryCache:
+    """
+    Cache de respostas/consultas no Redis com invalidação por tags
+
+    A chave inclui a versão de cada tag; invalidar uma tag é um INCR, que torna
+    inalcançáveis todas as entradas antigas (expiradas depois pelo TTL).
+    Requisições concorrentes pela mesma chave carregam o valor uma única vez
+    (lock local + SET NX no Redis). Se o Redis estiver indisponível, usa um LRU
+    em memória e tenta o Redis novamente após `retry_interval` segundos; as
+    tags invalidadas nesse intervalo ficam pendentes e recebem o INCR na
+    primeira chamada ao Redis que der certo, antes de qualquer leitura.
+    """
+
+    def __init__(
+        self,
+        client=None,
+        sync_client=None,
+        prefix: str = "cinema:cache",
+        default_ttl: int = 60,
+        lru_size: int = 1024,
+        lock_timeout: float = 10.0,
+        retry_interval: float = 30.0,
+    ):
+        self.client = client
+        self.sync_client = sync_client
+        self.prefix = prefix
+        self.default_ttl = default_ttl
+        self.lock_timeout = lock_timeout
+        self.retry_interval = retry_interval
+        self.local = LRUCache(lru_size)
+        self._local_versions = {}
+        # Tags invalidadas enquanto o Redis estava fora: INCR pendente
+        self._pending_tags = set()
+        self._pending_lock = threading.Lock()
+        self._locks = {}
+        self._redis_down_until = 0.0
+        self.stats = {"hits": 0, "misses": 0, "loads": 0, "redis_errors": 0}
+
+    @classmethod
+    def from_url(cls, url: Optional[str], **kwargs) -> "QueryCache":
+        if not url or aioredis is None:
+            return cls(**kwargs)
+        return cls(client=aioredis.from_url(url), sync_client=redis.Redis.from_url(url), **kwargs)
+
+    # Acesso ao Redis com fallback
+
+    def _redis_available(self) -> bool:
+        return self.client is not None and time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, error: Exception):
+        self.stats["redis_errors"] += 1
+        self._redis_down_until = time.monotonic() + self.retry_interval
+        logger.warning("Redis indisponível, usando cache em memória: %s", error)
+
+    async def _redis(self, method: str, *args, **kwargs):
+        if not self._redis_available():
+            return MISS
+        try:
+            if self._pending_tags:
+                await self._flush_pending_tags()
+            return await getattr(self.client, method)(*args, **kwargs)
+        except Exception as e:
+            self._redis_failed(e)
+            return MISS
+
+    def _add_pending_tags(self, tags: Iterable[str]):
+        with self._pending_lock:
+            self._pending_tags.update(tags)
+
+    def _take_pending_tags(self) -> set:
+        with self._pending_lock:
+            tags, self._pending_tags = self._pending_tags, set()
+        return tags
+
+    async def _flush_pending_tags(self):
+        """
+        INCR das tags invalidadas durante a queda; sem isso os outros processos
+        continuariam servindo as entradas antigas até o TTL
+        """
+        tags = self._take_pending_tags()
+        try:
+            for tag in sorted(tags):
+                await self.client.incr(self._version_key(tag))
+        except Exception:
+            # Reenviar tudo na próxima tentativa: um INCR a mais só gera um miss
+            self._add_pending_tags(tags)
+            raise
+
+    # Chaves e versões
+
+    def _version_key(self, tag: str) -> str:
+        return f"{self.prefix}:tag:{tag}"
+
+    async def _versions(self, tags: Iterable[str]) -> list:
+        tags = sorted(tags)
+        if not tags:
+            return []
+        versions = await self._redis("mget", [self._version_key(tag) for tag in tags])
+        if versions is MISS:
+            return [f"l{self._local_versions.get(tag, 0)}" for tag in tags]
+        return [int(version or 0) for version in versions]
+
+    async def make_key(self, namespace: str, params: dict, tags: Iterable[str] = ()) -> str:
+        versions = await self._versions(tags)
+        digest = hashlib.sha1(f"{versions}|{normalize_params(params)}".encode()).hexdigest()
+        return f"{self.prefix}:{namespace}:{digest}"
+
+    # Leitura e escrita
+
+    async def get(self, key: str):
+        raw = await self._redis("get", key)
+        if raw is MISS:
+            return self.local.get(key)
+        if raw is None:
+            return MISS
+        return json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        ttl = ttl or self.default_ttl
+        self.local.set(key, value, ttl)
+        await self._redis("set", key, json.dumps(value, default=str), ex=ttl)
+
+    async def get_or_set(
+        self,
+        namespace: str,
+        params: dict,
+        loader: Callable,
+        tags: Optional[Iterable[str]] = None,
+        ttl: Optional[int] = None,
+    ):
+        """
+        Valor em cache ou resultado de `loader()` (síncrono ou assíncrono)
+        """
+        tags = CACHE_NAMESPACES.get(namespace, ()) if tags is None else tags
+        key = await self.make_key(namespace, params, tags)
+
+        value = await self.get(key)
+        if value is not MISS:
+            self.stats["hits"] += 1
+            return value
+        self.stats["misses"] += 1
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                value = await self.get(key)
+                if value is not MISS:
+                    self.stats["hits"] += 1
+                    return value
+
+                acquired = await self._acquire(key)
+                if not acquired:
+                    # Outro worker está carregando: aguardar o resultado dele
+                    value = await self._wait_for(key)
+                    if value is not MISS:
+                        return value
+                try:
+                    self.stats["loads"] += 1
+                    value = loader()
+                    if inspect.isawaitable(value):
+                        value = await value
+                    await self.set(key, value, ttl)
+                    return value
+                finally:
+                    if acquired is True:
+                        await self._redis("delete", f"{key}:lock")
+        finally:
+            if not lock.locked():
+                self._locks.pop(key, None)
+
+    async def _acquire(self, key: str):
+        """True/False para o lock distribuído; None quando só há cache local"""
+        result = await self._redis("set", f"{key}:lock", "1", nx=True, px=int(self.lock_timeout * 1000))
+        if result is MISS:
+            return None
+        return bool(result)
+
+    async def _wait_for(self, key: str):
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.01
+        while time.monotonic() < deadline:
+            await asyncio.sleep(delay)
+            value = await self.get(key)
+            if value is not MISS:
+                return value
+            delay = min(delay * 2, 0.2)
+        return MISS
+
+    # Invalidação
+
+    async def invalidate(self, *tags: str):
+        for tag in tags:
+            self._local_versions[tag] = self._local_versions.get(tag, 0) + 1
+            if self.client is not None and await self._redis("incr", self._version_key(tag)) is MISS:
+                self._add_pending_tags([tag])
+
+    def invalidate_sync(self, *tags: str):
+        """Invalidação a partir de código síncrono (eventos de sessão do SQLAlchemy)"""
+        for tag in tags:
+            self._local_versions[tag] = self._local_versions.get(tag, 0) + 1
+        if self.sync_client is None:
+            return
+        if time.monotonic() < self._redis_down_until:
+            self._add_pending_tags(tags)
+            return
+        pending = self._take_pending_tags() | set(tags)
+        try:
+            pipeline = self.sync_client.pipeline()
+            for tag in sorted(pending):
+                pipeline.incr(self._version_key(tag))
+            pipeline.execute()
+        except Exception as e:
+            self._add_pending_tags(pending)
+            self._redis_failed(e)
+
+    def invalidate_tables(self, tables: Iterable[str]):
+        tags = sorted({tag for table in tables for tag in TABLE_TAGS.get(table, ())})
+        if tags:
+            self.invalidate_sync(*tags)
+
+    def install_invalidation_hooks(self, session_class):
+        """
+        Invalida as tags das tabelas alteradas quando a sessão faz commit
+        """
+        from sqlalchemy import event
+
+        @event.listens_for(session_class, "after_flush")
+        def _collect_tables(session, flush_context):
+            tables = session.info.setdefault("cache_tables", set())
+            for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+                table = getattr(instance, "__table__", None)
+                if table is not None:
+                    tables.add(table.name)
+
+        @event.listens_for(session_class, "after_commit")
+        def _invalidate(session):
+            tables = session.info.pop("cache_tables", None)
+            if tables:
+                self.invalidate_tables(tables)
+
+        @event.listens_for(session_class, "after_rollback")
+        def _discard(session):
+            session.info.pop("cache_tables", None)
+
+
+@functools.lru_cache()
+def get_query_cache() -> QueryCache:
+    """
+    Cache global, criado no primeiro uso (importar o módulo não lê o .env nem cria clientes Redis)
+    """
+    return QueryCache.from_url(
+        settings.REDIS_URL if settings.CACHE_ENABLED else None,
+        default_ttl=settings.CACHE_DEFAULT_TTL,
+        lru_size=settings.CACHE_LRU_SIZE,
+    )
+
+
+def __getattr__(name):
+    # Compatibilidade com `from .cache import query_cache`
+    if name == "query_cache":
+        return get_query_cache()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def cached(
+    namespace: str,
+    ttl: Optional[int] = None,
+    exclude: Iterable[str] = ("db", "current_user", "request"),
+    per_user: bool = True,
+):
+    """
+    Decorator para endpoints GET: chave = namespace + parâmetros de consulta normalizados
+
+    Com `current_user` nos argumentos, a chave inclui o id do usuário: uma
+    resposta filtrada pelas permissões de um usuário nunca é servida a outro.
+    Use per_user=False só em endpoints cuja resposta não depende do usuário.
+
+    Exemplo:
+        @router.get("/")
+        @cached("locations:list")
+        def list_locations(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)): ...
+    """
+    exclude = set(exclude)
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            params = {name: value for name, value in kwargs.items() if name not in exclude}
+            if per_user and kwargs.get("current_user") is not None:
+                params["__user__"] = user_scope(kwargs["current_user"])
+
+            async def load():
+                if inspect.iscoroutinefunction(func):
+                    result = await func(*args, **kwargs)
+                else:
+                    # Endpoints síncronos continuam fora do event loop (run_in_executor: Python 3.8)
+                    result = await asyncio.get_running_loop().run_in_executor(
+                        None, functools.partial(func, *args, **kwargs)
+                    )
+                try:
+                    from fastapi.encoders import jsonable_encoder
+                    return jsonable_encoder(result)
+                except ImportError:
+                    return result
+
+            return await get_query_cache().get_or_set(namespace, params, load, ttl=ttl)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+"""
+Calibração do custo do bcrypt para uma latência alvo neste hardware
+
+Mede o tempo de hash para cada custo e recomenda o maior valor de
+BCRYPT_ROUNDS que fica dentro do alvo. Hashes existentes com outro custo são
+refeitos automaticamente no próximo login (verify_and_update_password_async).
+
+Uso:
+    python calibrate_bcrypt.py --target-ms 250
+"""
+
+import argparse
+import os
+import sys
+
+# Adicionar backend ao path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
+
+from app.core.security import calibrate_bcrypt_rounds, pwd_context
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Calibrar o custo do bcrypt")
+    parser.add_argument('--target-ms', type=float, default=250.0, help="Latência alvo por hash (ms)")
+    parser.add_argument('--min-rounds', type=int, default=10)
+    parser.add_argument('--max-rounds', type=int, default=16)
+    args = parser.parse_args()
+
+    print("🔐 Calibração do bcrypt")
+    print(f"   Alvo: {args.target_ms:.0f} ms por hash")
+    print("=" * 40)
+
+    result = calibrate_bcrypt_rounds(args.target_ms, args.min_rounds, args.max_rounds)
+    for rounds, duration in result['timings_ms'].items():
+        marker = "✅" if rounds <= result['rounds'] else "❌"
+        print(f"   {marker} custo {rounds}: {duration:.1f} ms")
+
+    current = pwd_context.handler("bcrypt").default_rounds
+    print(f"\n💡 Recomendado: BCRYPT_ROUNDS={result['rounds']} (atual: {current})")
+    if result['rounds'] != current:
+        print("   Usuários terão o hash refeito no próximo login.")
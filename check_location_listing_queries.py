@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Verificação de N+1 da listagem de locações (GET /api/v1/locations)
+
+Conta as consultas de list_locations com cada combinação de `include=` e
+tamanhos de página diferentes: o número precisa ser o mesmo para 1 ou 500
+linhas (uma consulta IN por relação). Também confere as relações carregadas
+em lote contra a carga linha a linha. Sai com código 1 se algo falhar.
+
+Uso:
+    python check_location_listing_queries.py --database-url sqlite:///cinema_erp_large.db
+"""
+
+import argparse
+import sys
+from contextlib import contextmanager
+from itertools import combinations
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+
+from location_listing import INCLUDES, list_locations
+
+PAGE_SIZES = (1, 24, 500)
+
+
+@contextmanager
+def count_queries(engine):
+    """
+    Lista com os SQLs executados no engine dentro do bloco
+    """
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def expected_queries(include: tuple, cursor: bool) -> int:
+    """
+    Página (+ COUNT(*) no modo offset) + uma consulta por relação
+    """
+    return 1 + (0 if cursor else 1) + len(include)
+
+
+def check_relations(db, items: list) -> list:
+    """
+    Compara as relações em lote com a carga linha a linha (o N+1 que o include evita)
+    """
+    errors = []
+    for item in items:
+        tags = db.execute(text(
+            "SELECT DISTINCT t.id FROM location_tags lt JOIN tags t ON t.id = lt.tag_id WHERE lt.location_id = :id"
+        ), {"id": item["id"]}).scalars().all()
+        if sorted(tags) != sorted(tag["id"] for tag in item["tags"]):
+            errors.append(f"tags da locação {item['id']}")
+
+        photo = db.execute(text(
+            "SELECT id FROM location_photos WHERE location_id = :id "
+            "ORDER BY CASE WHEN is_primary THEN 0 ELSE 1 END, sort_order, id LIMIT 1"
+        ), {"id": item["id"]}).scalar()
+        if photo != (item["primary_photo"] or {}).get("id"):
+            errors.append(f"foto principal da locação {item['id']}")
+
+        supplier = db.execute(text(
+            "SELECT s.id FROM locations l JOIN suppliers s ON s.id = l.supplier_id WHERE l.id = :id"
+        ), {"id": item["id"]}).scalar()
+        if supplier != (item["supplier"] or {}).get("id"):
+            errors.append(f"fornecedor da locação {item['id']}")
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifica o número de consultas da listagem de locações")
+    parser.add_argument('--database-url', default='sqlite:///cinema_erp_large.db')
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    db = Session(engine)
+    failures = []
+
+    print("🔎 Consultas por requisição de GET /api/v1/locations")
+    print("=" * 60)
+    combos = [combo for size in range(len(INCLUDES) + 1) for combo in combinations(INCLUDES, size)]
+    for include in combos:
+        for use_cursor in (False, True):
+            cursor = list_locations(db, limit=1)["next_cursor"] if use_cursor else None
+            counts = []
+            for page_size in PAGE_SIZES:
+                with count_queries(engine) as statements:
+                    list_locations(db, limit=page_size, cursor=cursor, include=",".join(include))
+                counts.append(len(statements))
+            expected = expected_queries(include, use_cursor)
+            ok = all(count == expected for count in counts)
+            label = f"include={','.join(include) or '-'} {'cursor' if use_cursor else 'offset'}"
+            print(f"   {'✅' if ok else '❌'} {label:<45} {counts} (esperado {expected})")
+            if not ok:
+                failures.append(label)
+
+    page = list_locations(db, limit=100, include=",".join(INCLUDES))
+    errors = check_relations(db, page["items"])
+    print(f"\n   {'✅' if not errors else '❌'} Relações em lote iguais à carga linha a linha ({len(page['items'])} locações)")
+    failures += errors
+
+    slim = list_locations(db, limit=5, fields="title,city", sort="-created_at")
+    if any(set(item) != {"id", "title", "city"} for item in slim["items"]):
+        failures.append("fields=title,city devolveu outras colunas")
+
+    if failures:
+        print(f"\n❌ Falhas: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n✅ Número de consultas constante em todas as combinações de include")
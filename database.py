@@ -1,17 +1,437 @@
-from sqlalchemy import create_engine
+import itertools
+import logging
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import Select, TextClause, create_engine, event, exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from .config import settings
 
-# Criação do engine do banco de dados
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,
-    echo=settings.DEBUG
-)
+logger = logging.getLogger(__name__)
+
+
+class PoolMetrics:
+    """
+    Métricas do pool de conexões: tempo de espera no checkout e saturação
+    """
+
+    def __init__(self, sample_size: int = 1000):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=sample_size)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.peak_checked_out = 0
+        self.liveness_failures = 0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._waits.append(seconds)
+            self.checkouts += 1
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def record_checked_out(self, checked_out: int):
+        if checked_out > self.peak_checked_out:
+            self.peak_checked_out = checked_out
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            waits = sorted(self._waits)
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        checked_out = pool.checkedout()
+        percentile = lambda p: waits[min(len(waits) - 1, int(len(waits) * p))] * 1000 if waits else 0.0
+        return {
+            "pool_size": pool.size(),
+            "max_overflow": getattr(pool, "_max_overflow", 0),
+            "checked_out": checked_out,
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow(),
+            "saturation": checked_out / capacity if capacity > 0 else 0.0,
+            "peak_checked_out": self.peak_checked_out,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "liveness_failures": self.liveness_failures,
+            "wait_ms_avg": sum(waits) / len(waits) * 1000 if waits else 0.0,
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": waits[-1] * 1000 if waits else 0.0,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool que mede quanto tempo cada checkout esperou por uma conexão
+    """
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        finally:
+            pool_metrics.record_wait(time.perf_counter() - start)
+
+
+_IN_LIST = re.compile(r"\(\s*(\?|%s|%\(\w+\)s|:\w+|\$\d+)(\s*,\s*(\?|%s|%\(\w+\)s|:\w+|\$\d+))+\s*\)")
+_NUMBER = re.compile(r"(?<![\w.$])\d+(\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_WHITESPACE = re.compile(r"\s+")
+_shape_cache = {}
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Forma da consulta, sem literais e com listas IN colapsadas (agrupa execuções equivalentes)
+    """
+    shape = _shape_cache.get(statement)
+    if shape is None:
+        shape = _WHITESPACE.sub(" ", statement).strip()
+        shape = _STRING.sub("?", shape)
+        shape = _NUMBER.sub("?", shape)
+        shape = _IN_LIST.sub("(...)", shape)
+        if len(_shape_cache) < 5000:
+            _shape_cache[statement] = shape
+    return shape
+
+
+def parameter_shape(parameters, executemany: bool = False):
+    """
+    Tipos dos parâmetros (nunca os valores) para logs de consultas lentas
+    """
+    if executemany and isinstance(parameters, (list, tuple)) and parameters:
+        return f"{len(parameters)} x {parameter_shape(parameters[0])}"
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    if isinstance(parameters, (list, tuple)):
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+class QueryMetrics:
+    """
+    Histograma de latência, contagem e linhas afetadas por forma de consulta
+    """
+
+    BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+
+    def __init__(self, max_shapes: int = 2000):
+        self.max_shapes = max_shapes
+        self._lock = threading.Lock()
+        self._shapes = {}
+
+    def record(self, shape: str, elapsed_ms: float, rowcount: Optional[int]):
+        with self._lock:
+            entry = self._shapes.get(shape)
+            if entry is None:
+                if len(self._shapes) >= self.max_shapes:
+                    shape = "<outras>"
+                    entry = self._shapes.get(shape)
+                if entry is None:
+                    entry = self._shapes[shape] = {
+                        "count": 0, "total_ms": 0.0, "max_ms": 0.0, "rows": 0,
+                        "buckets": [0] * (len(self.BUCKETS_MS) + 1),
+                    }
+            entry["count"] += 1
+            entry["total_ms"] += elapsed_ms
+            entry["max_ms"] = max(entry["max_ms"], elapsed_ms)
+            if rowcount is not None and rowcount > 0:
+                entry["rows"] += rowcount
+            index = next((i for i, bound in enumerate(self.BUCKETS_MS) if elapsed_ms <= bound), len(self.BUCKETS_MS))
+            entry["buckets"][index] += 1
+
+    def snapshot(self, top: int = 50) -> dict:
+        with self._lock:
+            shapes = {shape: dict(entry, buckets=list(entry["buckets"])) for shape, entry in self._shapes.items()}
+        ranked = sorted(shapes.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:top]
+        labels = [f"<={bound}ms" for bound in self.BUCKETS_MS] + [f">{self.BUCKETS_MS[-1]}ms"]
+        return {
+            "statements": sum(entry["count"] for entry in shapes.values()),
+            "total_ms": sum(entry["total_ms"] for entry in shapes.values()),
+            "shapes": [
+                {
+                    "statement": shape,
+                    "count": entry["count"],
+                    "avg_ms": entry["total_ms"] / entry["count"],
+                    "max_ms": entry["max_ms"],
+                    "total_ms": entry["total_ms"],
+                    "rows": entry["rows"],
+                    "histogram": dict(zip(labels, entry["buckets"])),
+                }
+                for shape, entry in ranked
+            ],
+        }
+
+    def reset(self):
+        with self._lock:
+            self._shapes.clear()
+
+
+query_metrics = QueryMetrics()
+
+
+class RequestQueryStats:
+    """
+    Consultas executadas durante uma requisição (detecta padrões N+1)
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes = Counter()
+        self.n_plus_one = set()
+
+    def record(self, shape: str, elapsed_ms: float):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.shapes[shape] += 1
+        if self.shapes[shape] == settings.DB_N_PLUS_ONE_THRESHOLD and shape.upper().startswith("SELECT"):
+            self.n_plus_one.add(shape)
+            logger.warning("Possível N+1: consulta repetida %d vezes na requisição: %s", self.shapes[shape], shape)
+
+    def header_value(self) -> str:
+        return f"count={self.count}; time_ms={self.total_ms:.1f}; n_plus_one={len(self.n_plus_one)}"
+
+
+_request_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("request_query_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started_at = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started_at = getattr(context, "_query_started_at", None)
+    if started_at is None:
+        return
+    elapsed_ms = (time.perf_counter() - started_at) * 1000
+    shape = statement_shape(statement)
+    rowcount = getattr(cursor, "rowcount", None)
+    query_metrics.record(shape, elapsed_ms, rowcount)
+
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.record(shape, elapsed_ms)
+
+    if elapsed_ms >= settings.DB_SLOW_QUERY_MS:
+        logger.warning(
+            "Consulta lenta (%.1f ms): %s | parâmetros: %s",
+            elapsed_ms, shape, parameter_shape(parameters, executemany),
+        )
+
+
+def instrument_engine(engine):
+    """
+    Registra os hooks de latência/N+1 no engine (síncrono ou .sync_engine de um assíncrono)
+    """
+    if settings.DB_QUERY_METRICS:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    return engine
+
+
+class QueryMetricsMiddleware:
+    """
+    Middleware ASGI: estatísticas de consultas por requisição e, em DEBUG,
+    o cabeçalho X-DB-Queries (ex.: "count=12; time_ms=34.5; n_plus_one=1")
+
+    Uso: app.add_middleware(QueryMetricsMiddleware)
+    """
+
+    def __init__(self, app):
+        self.app = app
 
-# Criação da sessão
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestQueryStats()
+        token = _request_stats.set(stats)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start" and settings.DEBUG:
+                headers = list(message.get("headers", []))
+                headers.append((b"x-db-queries", stats.header_value().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            _request_stats.reset(token)
+
+
+def _engine_options(database_url: str) -> dict:
+    """
+    Opções do engine a partir das configurações de pool
+    """
+    options = {
+        "echo": settings.DB_ECHO,
+        "pool_pre_ping": settings.DB_POOL_LIVENESS == "pre_ping",
+    }
+    if database_url.startswith("sqlite") and ":memory:" in database_url:
+        # SQLite em memória usa um pool de conexão única
+        return options
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    if database_url.startswith("sqlite"):
+        options["connect_args"] = {"check_same_thread": False}
+    return options
+
+
+_engine = None
+_replica_engines = []
+_replica_cycle = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """
+    Engine do banco de dados, criado no primeiro uso (importar o módulo não conecta nem lê o .env)
+    """
+    global _engine, _replica_engines, _replica_cycle
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                engine = create_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
+                event.listen(engine, "checkout", _on_checkout)
+                instrument_engine(engine)
+
+                # Réplicas de leitura (métricas de pool ficam restritas ao primário)
+                _replica_engines = [
+                    instrument_engine(
+                        create_engine(url, **{k: v for k, v in _engine_options(url).items() if k != "poolclass"})
+                    )
+                    for url in settings.DATABASE_REPLICA_URLS
+                ]
+                _replica_cycle = itertools.cycle(_replica_engines) if _replica_engines else None
+
+                if settings.DB_POOL_LIVENESS == "background":
+                    threading.Thread(
+                        target=_liveness_loop,
+                        args=(settings.DB_POOL_LIVENESS_INTERVAL,),
+                        name="db-pool-liveness",
+                        daemon=True,
+                    ).start()
+                _engine = engine
+    return _engine
+
+
+def get_replica_engines() -> list:
+    get_engine()
+    return _replica_engines
+
+
+def __getattr__(name):
+    # Compatibilidade com `from .database import engine`
+    if name == "engine":
+        return get_engine()
+    if name == "replica_engines":
+        return get_replica_engines()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.record_checked_out(get_engine().pool.checkedout())
+
+
+def _liveness_loop(interval: int):
+    """
+    Verificação periódica em background, em vez de um round trip a cada checkout
+    """
+    while True:
+        time.sleep(interval)
+        engine = get_engine()
+        try:
+            with engine.connect() as connection:
+                connection.exec_driver_sql("SELECT 1")
+        except Exception as e:
+            # Conexões ociosas provavelmente caíram junto: recriar o pool inteiro
+            pool_metrics.liveness_failures += 1
+            logger.warning("Verificação de conexão falhou, recriando pool: %s", e)
+            engine.dispose()
+
+
+class RoutingSession(Session):
+    """
+    Sessão que envia leituras para uma réplica e escritas para o primário
+
+    Depois da primeira escrita (flush ou INSERT/UPDATE/DELETE explícito) a
+    sessão passa a usar só o primário, garantindo read-your-writes dentro da
+    requisição. SELECT ... FOR UPDATE também vai para o primário. Sem réplicas
+    configuradas, tudo vai para o primário.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._use_primary = False
+        get_engine()
+        self._replica = next(_replica_cycle) if _replica_cycle else None
+
+    def use_primary(self):
+        """Forçar o primário pelo resto da sessão (ex.: leitura logo após escrita em outro serviço)"""
+        self._use_primary = True
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.bind is not None:
+            return super().get_bind(mapper, clause=clause, **kwargs)
+        if self._replica is None or self._use_primary or self._flushing:
+            return get_engine()
+        if clause is None:
+            # Consulta ao bind sem instrução (ex.: db.get_bind().dialect): primário, sem fixar a sessão nele
+            return get_engine()
+        if self._is_read(clause):
+            return self._replica
+        self._use_primary = True
+        return get_engine()
+
+    @staticmethod
+    def _is_read(clause) -> bool:
+        if isinstance(clause, Select):
+            return clause._for_update_arg is None
+        if isinstance(clause, TextClause):
+            return clause.text.lstrip().upper().startswith("SELECT") and "FOR UPDATE" not in clause.text.upper()
+        return False
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _stick_to_primary(session, flush_context):
+    session._use_primary = True
+
+
+# Criação da sessão (o engine é resolvido em RoutingSession.get_bind)
+SessionLocal = sessionmaker(class_=RoutingSession, autocommit=False, autoflush=False)
+
+# Sessões assíncronas: o engine é criado no primeiro uso, para que o driver
+# assíncrono (asyncpg/aiosqlite) só seja exigido por quem usa get_async_db
+AsyncSessionLocal = async_sessionmaker(class_=AsyncSession, autoflush=False, expire_on_commit=False)
+_async_engine = None
+
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
 
 # Base para os modelos
 Base = declarative_base()
@@ -28,15 +448,63 @@ def get_db():
         db.close()
 
 
+def async_database_url(database_url: str) -> str:
+    """
+    Converte a URL síncrona para o driver assíncrono equivalente
+    """
+    scheme, separator, rest = database_url.partition("://")
+    return f"{ASYNC_DRIVERS.get(scheme, scheme)}{separator}{rest}"
+
+
+def get_async_engine():
+    """
+    Engine assíncrono, criado e associado ao AsyncSessionLocal no primeiro uso
+    """
+    global _async_engine
+    if _async_engine is None:
+        url = settings.ASYNC_DATABASE_URL or async_database_url(settings.DATABASE_URL)
+        options = _engine_options(url)
+        # O pool assíncrono padrão (AsyncAdaptedQueuePool) substitui o pool instrumentado
+        options.pop("poolclass", None)
+        options.pop("connect_args", None)
+        _async_engine = create_async_engine(url, **options)
+        instrument_engine(_async_engine.sync_engine)
+        AsyncSessionLocal.configure(bind=_async_engine)
+    return _async_engine
+
+
+async def get_async_db():
+    """
+    Dependency para obter uma sessão assíncrona do banco de dados
+    """
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_metrics() -> dict:
+    """
+    Estado atual do pool (para endpoint de métricas ou logs periódicos)
+    """
+    return pool_metrics.snapshot(get_engine().pool)
+
+
+def get_query_metrics(top: int = 50) -> dict:
+    """
+    Consultas mais caras (tempo total) com histograma de latência, para o endpoint de métricas
+    """
+    return query_metrics.snapshot(top)
+
+
 def create_tables():
     """
     Cria todas as tabelas no banco de dados
     """
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_engine())
 
 
 def drop_tables():
     """
     Remove todas as tabelas do banco de dados
     """
-    Base.metadata.drop_all(bind=engine)
+    Base.metadata.drop_all(bind=get_engine())
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Index advisor: propõe índices compostos a partir de um log de consultas
+
+Lê um log de consultas (JSON de get_query_metrics(), ou arquivo .sql/.log com
+uma consulta por linha/;), analisa filtros de igualdade, intervalos, JOINs e
+ORDER BY de cada consulta e propõe índices compostos para as tabelas quentes.
+Compara EXPLAIN QUERY PLAN e tempo de cada consulta antes e depois de criar os
+índices em uma base de teste (ex.: gerada por generate_large_dataset.py) e
+grava a migração SQL correspondente.
+
+Uso:
+    python generate_large_dataset.py --scale 0.1 --output cinema_erp_large.db
+    python index_advisor.py --database cinema_erp_large.db
+    python index_advisor.py --database cinema_erp_large.db --query-log query_metrics.json --apply
+    python index_advisor.py --database cinema_erp_large.db --dialect postgresql
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import statistics
+import time
+from collections import Counter
+from datetime import datetime
+
+# Consultas quentes dos endpoints de listagem quando não há log capturado
+DEFAULT_WORKLOAD = [
+    ("SELECT * FROM locations WHERE city = ? AND status = ? ORDER BY created_at DESC LIMIT 50", 400),
+    ("SELECT * FROM locations WHERE state = ? AND status = ? ORDER BY created_at DESC LIMIT 50", 150),
+    ("SELECT * FROM locations WHERE project_id = ? ORDER BY id", 120),
+    ("SELECT * FROM location_photos WHERE location_id = ? ORDER BY sort_order", 500),
+    ("SELECT tag_id FROM location_tags WHERE location_id = ?", 300),
+    ("SELECT * FROM agenda_events WHERE event_date BETWEEN ? AND ? ORDER BY event_date", 200),
+    ("SELECT * FROM visits WHERE start_datetime >= ? AND start_datetime < ? ORDER BY start_datetime", 80),
+    ("SELECT * FROM notifications WHERE user_id = ? AND is_read = ? ORDER BY created_at DESC LIMIT 20", 350),
+    ("SELECT * FROM audit_log WHERE entity = ? AND entity_id = ? ORDER BY created_at DESC LIMIT 50", 60),
+]
+
+CLAUSE_END = r"(?=\s+(?:left\s+|inner\s+|outer\s+)?join\b|\s+where\b|\s+group\s+by\b|\s+order\s+by\b|\s+limit\b|$)"
+FROM_RE = re.compile(r"\bfrom\s+(\w+)(?:\s+(?:as\s+)?(?!where\b|join\b|left\b|inner\b|order\b|group\b|limit\b)(\w+))?")
+JOIN_RE = re.compile(
+    r"\bjoin\s+(\w+)(?:\s+(?:as\s+)?(?!on\b)(\w+))?\s+on\s+(.+?)" + CLAUSE_END
+)
+WHERE_RE = re.compile(r"\bwhere\s+(.+?)(?=\s+group\s+by\b|\s+order\s+by\b|\s+limit\b|$)")
+ORDER_RE = re.compile(r"\border\s+by\s+(.+?)(?=\s+limit\b|$)")
+PREDICATE_RE = re.compile(
+    r"(?:(\w+)\.)?(\w+)\s*(=|==|>=|<=|>|<|\bbetween\b|\bin\b|\bis\b|\blike\b)\s*(\?|\(|:\w+|'[^']*'|\d+|null|not)"
+)
+PLACEHOLDER_RE = re.compile(r"\?")
+# Marcadores dos outros paramstyles do DB-API (psycopg2: %s e %(nome)s; SQLAlchemy text(): :nome;
+# IN expandido do SQLAlchemy: __[POSTCOMPILE_nome]). `::tipo` do PostgreSQL não é marcador.
+PARAMSTYLE_RE = re.compile(r"%\(\w+\)s|%s|(?<![:\w]):\w+|__\[postcompile_\w+\]")
+
+
+def normalize(sql: str) -> str:
+    """Espaços e caixa uniformes, todos os paramstyles convertidos para `?` (o do sqlite3)"""
+    sql = re.sub(r"\s+", " ", sql).strip().rstrip(";").lower()
+    return PARAMSTYLE_RE.sub("?", sql)
+
+
+def load_query_log(path: str) -> list:
+    """(consulta, frequência) a partir de JSON de métricas ou de arquivo texto"""
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError:
+        statements = [s for s in re.split(r";\s*\n|\n", content) if s.strip() and not s.strip().startswith('--')]
+        return list(Counter(normalize(s) for s in statements).items())
+
+    shapes = data.get('shapes', data.get('queries', {}).get('shapes', [])) if isinstance(data, dict) else data
+    return [(entry['statement'], entry.get('count', 1)) for entry in shapes]
+
+
+class IndexAdvisor:
+    """Analisa consultas e mede planos/tempos em uma base SQLite"""
+
+    def __init__(self, database: str, runs: int = 5, seed: int = 42):
+        self.conn = sqlite3.connect(database)
+        self.runs = runs
+        self.rng = random.Random(seed)
+        self._columns = {}
+        self._distinct = {}
+        self._max_rowid = {}
+
+    # Esquema
+
+    def columns(self, table: str) -> list:
+        if table not in self._columns:
+            self._columns[table] = [row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")]
+        return self._columns[table]
+
+    def existing_indexes(self, table: str) -> list:
+        indexes = []
+        for index in self.conn.execute(f"PRAGMA index_list({table})").fetchall():
+            columns = [row[2] for row in self.conn.execute(f"PRAGMA index_info({index[1]})")]
+            indexes.append((index[1], columns))
+        return indexes
+
+    def distinct_ratio(self, table: str, column: str) -> float:
+        """Seletividade aproximada (valores distintos / linhas) em uma amostra"""
+        key = (table, column)
+        if key not in self._distinct:
+            rows = self.conn.execute(f"SELECT {column} FROM {table} LIMIT 20000").fetchall()
+            self._distinct[key] = len(set(rows)) / len(rows) if rows else 0.0
+        return self._distinct[key]
+
+    # Análise das consultas
+
+    def parse(self, sql: str) -> dict:
+        """Tabelas, colunas de igualdade/intervalo e ORDER BY por tabela"""
+        sql = normalize(sql)
+        aliases, tables = {}, []
+        match = FROM_RE.search(sql)
+        if not match:
+            return {}
+        tables.append(match.group(1))
+        aliases[match.group(2) or match.group(1)] = match.group(1)
+        aliases[match.group(1)] = match.group(1)
+
+        usage = {}
+
+        def use(table, kind, column):
+            if table and column in self.columns(table):
+                entry = usage.setdefault(table, {'eq': [], 'range': [], 'order': []})
+                if column not in entry[kind]:
+                    entry[kind].append(column)
+
+        def resolve(qualifier, column):
+            if qualifier:
+                return aliases.get(qualifier)
+            return next((table for table in tables if column in self.columns(table)), None)
+
+        for join in JOIN_RE.finditer(sql):
+            tables.append(join.group(1))
+            aliases[join.group(2) or join.group(1)] = join.group(1)
+            aliases[join.group(1)] = join.group(1)
+            for left_alias, left_column, right_alias, right_column in re.findall(r"(\w+)\.(\w+)\s*=\s*(\w+)\.(\w+)", join.group(3)):
+                # Lado da tabela que entra no JOIN precisa de índice na coluna de junção
+                if aliases.get(left_alias) == join.group(1):
+                    use(join.group(1), 'eq', left_column)
+                if aliases.get(right_alias) == join.group(1):
+                    use(join.group(1), 'eq', right_column)
+
+        where = WHERE_RE.search(sql)
+        if where:
+            for qualifier, column, operator, _ in PREDICATE_RE.findall(where.group(1)):
+                table = resolve(qualifier, column)
+                if operator in ('=', '==', 'in', 'is'):
+                    use(table, 'eq', column)
+                elif operator != 'like':
+                    use(table, 'range', column)
+
+        order = ORDER_RE.search(sql)
+        if order:
+            for term in order.group(1).split(','):
+                parts = term.strip().split()[0].split('.')
+                qualifier, column = (parts[0], parts[1]) if len(parts) == 2 else (None, parts[0])
+                use(resolve(qualifier, column), 'order', column)
+
+        return usage
+
+    def candidates(self, workload: list) -> list:
+        """Índices compostos propostos: igualdade (mais seletiva primeiro) + intervalo ou ordenação"""
+        proposals = {}
+        for sql, frequency in workload:
+            for table, usage in self.parse(sql).items():
+                eq = sorted(usage['eq'], key=lambda column: self.distinct_ratio(table, column), reverse=True)
+                eq = [column for column in eq if column != 'id']
+                if usage['range']:
+                    tail = usage['range'][:1]
+                else:
+                    tail = [column for column in usage['order'] if column not in eq and column != 'id']
+                columns = tuple(eq + tail)
+                if not columns:
+                    continue
+                entry = proposals.setdefault((table, columns), {'frequency': 0, 'queries': []})
+                entry['frequency'] += frequency
+                entry['queries'].append(sql)
+
+        # Remover propostas cobertas por índices existentes ou por outra proposta mais longa
+        result = []
+        for (table, columns), entry in proposals.items():
+            covered = any(list(columns) == existing[:len(columns)] for _, existing in self.existing_indexes(table))
+            longer = any(
+                other_table == table and len(other) > len(columns) and other[:len(columns)] == columns
+                for other_table, other in proposals
+            )
+            if covered or longer:
+                continue
+            result.append({
+                'table': table,
+                'columns': list(columns),
+                'name': f"ix_{table}_{'_'.join(columns)}",
+                'frequency': entry['frequency'],
+                'queries': entry['queries'],
+            })
+        return sorted(result, key=lambda proposal: proposal['frequency'], reverse=True)
+
+    # Execução
+
+    def sample_value(self, table: str, column: str):
+        if table not in self._max_rowid:
+            self._max_rowid[table] = self.conn.execute(f"SELECT MAX(rowid) FROM {table}").fetchone()[0] or 1
+        rowid = self.rng.randint(1, self._max_rowid[table])
+        row = self.conn.execute(
+            f"SELECT {column} FROM {table} WHERE rowid >= ? AND {column} IS NOT NULL LIMIT 1", (rowid,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def bind(self, sql: str) -> tuple:
+        """Substitui `IN (...)` e gera valores reais da base para cada marcador (qualquer paramstyle)"""
+        sql = normalize(sql).replace("in (...)", "in (?)")
+        params = []
+        tables = [FROM_RE.search(sql).group(1)] + [m.group(1) for m in JOIN_RE.finditer(sql)]
+        for placeholder in PLACEHOLDER_RE.finditer(sql):
+            before = sql[:placeholder.start()]
+            if re.search(r"\blimit\s*$|\boffset\s*$", before):
+                params.append(50)
+                continue
+            match = re.search(r"(?:\w+\.)?(\w+)\s*(?:=|==|>=|<=|>|<|\bbetween\b|\bin\s*\(|\blike\b)\s*$", before)
+            between_upper = re.search(r"(?:\w+\.)?(\w+)\s+between\s+\?\s+and\s*$", before)
+            column = (between_upper or match).group(1) if (between_upper or match) else None
+            table = next((t for t in tables if column in self.columns(t)), None)
+            value = self.sample_value(table, column) if table else None
+            if between_upper and params and value is not None and params[-1] is not None and value < params[-1]:
+                params[-1], value = value, params[-1]
+            params.append(value)
+        return sql, params
+
+    def explain(self, sql: str, params: list) -> list:
+        return [row[3] for row in self.conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    def measure(self, workload: list) -> dict:
+        results = {}
+        for sql, _ in workload:
+            bound_sql, params = self.bind(sql)
+            timings = []
+            for _ in range(self.runs):
+                start = time.perf_counter()
+                self.conn.execute(bound_sql, params).fetchall()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[sql] = {'plan': self.explain(bound_sql, params), 'median_ms': statistics.median(timings)}
+        return results
+
+    def create_indexes(self, proposals: list):
+        for proposal in proposals:
+            self.conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {proposal['name']} ON {proposal['table']} ({', '.join(proposal['columns'])})"
+            )
+        self.analyze()
+
+    def analyze(self):
+        """Estatísticas atualizadas para o planejador (antes e depois dos índices, para comparar iguais)"""
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+
+    def drop_indexes(self, proposals: list):
+        for proposal in proposals:
+            self.conn.execute(f"DROP INDEX IF EXISTS {proposal['name']}")
+        self.conn.commit()
+
+
+def write_migration(proposals: list, dialect: str, directory: str = 'migrations') -> str:
+    """Migração SQL com os índices propostos"""
+    os.makedirs(directory, exist_ok=True)
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    path = os.path.join(directory, f"{timestamp}_index_advisor_{dialect}.sql")
+    concurrently = " CONCURRENTLY" if dialect == 'postgresql' else ""
+    lines = [
+        f"-- Índices propostos por index_advisor.py em {datetime.now().isoformat(timespec='seconds')}",
+        "-- PostgreSQL: CREATE INDEX CONCURRENTLY não pode rodar dentro de transação" if concurrently else None,
+        "",
+    ]
+    for proposal in proposals:
+        lines.append(f"-- {proposal['frequency']} execuções no log")
+        lines.append(
+            f"CREATE INDEX{concurrently} IF NOT EXISTS {proposal['name']} "
+            f"ON {proposal['table']} ({', '.join(proposal['columns'])});"
+        )
+    lines.append("ANALYZE;")
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("\n".join(line for line in lines if line is not None) + "\n")
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Propor e medir índices compostos a partir de um log de consultas")
+    parser.add_argument('--database', default='cinema_erp_large.db', help="Base SQLite de teste (fixture grande)")
+    parser.add_argument('--query-log', help="JSON de get_query_metrics() ou arquivo .sql/.log")
+    parser.add_argument('--dialect', choices=['sqlite', 'postgresql'], default='sqlite', help="Dialeto da migração")
+    parser.add_argument('--apply', action='store_true', help="Manter os índices criados na base")
+    parser.add_argument('--runs', type=int, default=5, help="Execuções por consulta na medição")
+    parser.add_argument('--output', default='index_advisor_report.json', help="Relatório JSON")
+    args = parser.parse_args()
+
+    workload = load_query_log(args.query_log) if args.query_log else DEFAULT_WORKLOAD
+    advisor = IndexAdvisor(args.database, runs=args.runs)
+
+    print("🗂️ Index advisor")
+    print(f"   Base: {args.database} | Consultas: {len(workload)}")
+    print("=" * 60)
+
+    proposals = advisor.candidates(workload)
+    if not proposals:
+        print("✅ Nenhum índice novo necessário para este log")
+        return
+
+    for proposal in proposals:
+        print(f"   ➕ {proposal['name']} ({proposal['frequency']} execuções)")
+
+    print("\n⏱️ Medindo antes...")
+    advisor.analyze()
+    before = advisor.measure(workload)
+    advisor.create_indexes(proposals)
+    print("⏱️ Medindo depois...")
+    after = advisor.measure(workload)
+    if not args.apply:
+        advisor.drop_indexes(proposals)
+
+    report = {'database': args.database, 'indexes': proposals, 'queries': []}
+    for sql, frequency in workload:
+        speedup = before[sql]['median_ms'] / after[sql]['median_ms'] if after[sql]['median_ms'] > 0 else float('inf')
+        report['queries'].append({
+            'statement': sql,
+            'frequency': frequency,
+            'before': before[sql],
+            'after': after[sql],
+            'speedup': speedup,
+        })
+        print(f"\n🔎 {sql}")
+        print(f"   Antes:  {before[sql]['median_ms']:.2f} ms | {'; '.join(before[sql]['plan'])}")
+        print(f"   Depois: {after[sql]['median_ms']:.2f} ms | {'; '.join(after[sql]['plan'])}")
+        print(f"   🚀 {speedup:.1f}x")
+
+    migration = write_migration(proposals, args.dialect)
+    report['migration'] = migration
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print(f"\n📄 Migração: {migration}")
+    print(f"📄 Relatório salvo em: {args.output}")
+    print("✅ Índices aplicados na base" if args.apply else "💡 Use --apply para manter os índices na base")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+import re
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from typing import Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from location_search import matching_ids_query, search_locations
+
+# Facetas de valor exato (colunas de locations)
+FACET_FIELDS = ("city", "state", "sector_type", "space_type", "status")
+
+# Limites inferiores das faixas exibidas; a última é aberta ("10000+")
+PRICE_BUCKETS = (0, 1000, 2000, 5000, 10000)
+CAPACITY_BUCKETS = (0, 20, 50, 100, 200)
+
+# Grades dos filtros de faixa: um bitmap cumulativo ("valor < limite") por ponto.
+# Limites fora da grade consultam só a fatia entre o limite e o ponto mais próximo.
+RANGE_GRIDS = {
+    "price_day_cinema": tuple(range(0, 20001, 250)),
+    "capacity": (0, 5, 10, 15, 20, 25, 30, 40, 50, 60, 70, 80, 90, 100, 120, 150, 200, 250, 300, 400, 500, 750, 1000),
+}
+
+# Só as tags mais usadas viram bitmap (a interface mostra as principais)
+FACET_TAG_LIMIT = 50
+
+# Segundos até reconstruir os bitmaps mesmo sem escritas observadas
+FACET_INDEX_TTL = 300
+
+# Escritas que mudam as facetas (ver FacetIndex.watch)
+FACET_WRITE = re.compile(r'^\s*(INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+"?(locations|location_tags|tags)"?[\s(]', re.I)
+
+
+def bucket_labels(bounds: tuple) -> list:
+    """
+    (0, 20, 50) -> ["0-20", "20-50", "50+"]
+    """
+    labels = [f"{low:g}-{high:g}" for low, high in zip(bounds, bounds[1:])]
+    return labels + [f"{bounds[-1]:g}+"]
+
+
+def ids_to_bitmap(ids, size: int = 0) -> int:
+    """
+    Conjunto de ids -> int com o bit `id` ligado
+
+    `size` só dimensiona o buffer inicial: ids criados depois da montagem do
+    índice fazem o buffer crescer.
+    """
+    bits = bytearray(size // 8 + 1)
+    for location_id in ids:
+        byte = location_id >> 3
+        if byte >= len(bits):
+            bits.extend(bytes(max(byte + 1, 2 * len(bits)) - len(bits)))
+        bits[byte] |= 1 << (location_id & 7)
+    return int.from_bytes(bits, "little")
+
+
+def popcount(bitmap: int) -> int:
+    """
+    Bits ligados do bitmap (int.bit_count() só existe a partir do Python 3.10)
+    """
+    return bin(bitmap).count("1")
+
+
+class FacetIndex:
+    """
+    Bitmaps por valor de faceta: um int do Python por valor, bit i = locação i
+
+    Contar as facetas de qualquer conjunto de resultados é um AND + popcount
+    por valor, sem varrer locations nem um GROUP BY por faceta; os filtros de
+    cidade, status e faixas também viram ANDs. Com 1M de locações cada bitmap
+    ocupa ~125 KB (~27 MB no total, incluindo as grades de faixa).
+    """
+
+    def __init__(self, max_age: int = FACET_INDEX_TTL, tag_limit: int = FACET_TAG_LIMIT):
+        self.max_age = max_age
+        self.tag_limit = tag_limit
+        self.bitmaps = {}  # faceta -> {valor: bitmap}
+        self.below = {}  # campo de faixa -> {ponto da grade: bitmap de valor < ponto}
+        self.not_null = {}  # campo de faixa -> bitmap de valor preenchido
+        self.all = 0
+        self.size = 0
+        self.built_at = None
+        self.version = 0  # incrementado a cada escrita confirmada em locations/tags
+        self.built_version = 0
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._watched = set()
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+
+    @property
+    def stale(self) -> bool:
+        return (
+            self.built_at is None
+            or self.built_version != self.version
+            or time.monotonic() - self.built_at > self.max_age
+        )
+
+    def watch(self, engine):
+        """
+        Invalida os bitmaps a cada commit que escreveu em locations, location_tags ou tags
+
+        Vale para qualquer caminho de escrita do engine (ORM ou SQL direto).
+        Transações desfeitas não invalidam.
+        """
+        if id(engine) in self._watched:
+            return
+        self._watched.add(id(engine))
+
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if FACET_WRITE.match(statement):
+                conn.info["facets_dirty"] = True
+
+        def commit(conn):
+            if conn.info.pop("facets_dirty", False):
+                self.invalidate()
+
+        def rollback(conn):
+            conn.info.pop("facets_dirty", None)
+
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        event.listen(engine, "commit", commit)
+        event.listen(engine, "rollback", rollback)
+
+    def build(self, db):
+        """
+        Lê as colunas das facetas e as tags mais usadas e monta os bitmaps
+        """
+        # Escritas durante a leitura deixam o resultado já desatualizado
+        version = self.version
+        size = (db.execute(text("SELECT MAX(id) FROM locations")).scalar() or 0) + 1
+        width = size // 8 + 1
+        builders = {facet: {} for facet in FACET_FIELDS + ("tag",)}
+        # Células entre pontos consecutivos da grade (a última é aberta)
+        cells = {field: [bytearray(width) for _ in grid] for field, grid in RANGE_GRIDS.items()}
+        every = bytearray(width)
+
+        def mark(facet: str, value, byte: int, bit: int):
+            if value is None:
+                return
+            bits = builders[facet].get(value)
+            if bits is None:
+                bits = builders[facet][value] = bytearray(width)
+            bits[byte] |= bit
+
+        range_fields = tuple(RANGE_GRIDS)
+        rows = db.execute(text(
+            f"SELECT id, {', '.join(FACET_FIELDS + range_fields)} FROM locations"
+        ))
+        for row in rows:
+            location_id = row[0]
+            byte, bit = location_id >> 3, 1 << (location_id & 7)
+            every[byte] |= bit
+            for facet, value in zip(FACET_FIELDS, row[1:]):
+                mark(facet, value, byte, bit)
+            for field, value in zip(range_fields, row[1 + len(FACET_FIELDS):]):
+                if value is not None and value >= 0:
+                    cells[field][bisect_right(RANGE_GRIDS[field], value) - 1][byte] |= bit
+
+        tag_rows = db.execute(text(
+            "SELECT t.name, lt.location_id FROM location_tags lt JOIN tags t ON t.id = lt.tag_id "
+            "WHERE lt.tag_id IN (SELECT tag_id FROM location_tags GROUP BY tag_id "
+            "ORDER BY COUNT(*) DESC LIMIT :limit)"
+        ), {"limit": self.tag_limit})
+        for name, location_id in tag_rows:
+            mark("tag", name, location_id >> 3, 1 << (location_id & 7))
+
+        bitmaps = {
+            facet: {value: int.from_bytes(bits, "little") for value, bits in values.items()}
+            for facet, values in builders.items()
+        }
+        below, not_null = {}, {}
+        for field, grid in RANGE_GRIDS.items():
+            cumulative, below[field] = 0, {}
+            for point, cell in zip(grid, cells[field]):
+                below[field][point] = cumulative
+                cumulative |= int.from_bytes(cell, "little")
+            not_null[field] = cumulative
+
+        # Faixas exibidas = diferenças de bitmaps cumulativos
+        for facet, field, bounds in (("price", "price_day_cinema", PRICE_BUCKETS), ("capacity", "capacity", CAPACITY_BUCKETS)):
+            edges = [below[field][bound] for bound in bounds] + [not_null[field]]
+            bitmaps[facet] = {
+                label: high & ~low for label, low, high in zip(bucket_labels(bounds), edges, edges[1:])
+            }
+
+        with self._lock:
+            self.bitmaps, self.below, self.not_null = bitmaps, below, not_null
+            self.all, self.size = int.from_bytes(every, "little"), size
+            self.built_at, self.built_version = time.monotonic(), version
+
+    def ensure(self, db):
+        """
+        Primeira montagem síncrona; depois de `max_age` ou de uma escrita, reconstrói
+        em background servindo a anterior (contagens aproximadas enquanto isso)
+        """
+        self.watch(db.get_bind())
+        if not self.stale:
+            return
+        if not self.bitmaps:
+            self.build(db)
+            return
+        with self._lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, args=(db.get_bind(),), daemon=True).start()
+
+    def _rebuild(self, bind):
+        try:
+            with Session(bind) as session:
+                self.build(session)
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def _slice(self, db, field: str, low: float, high: Optional[float], include_high: bool = False) -> int:
+        """
+        Bitmap de low <= campo < high (ou <= high), direto do banco: só a fatia fora da grade
+        """
+        condition = f"{field} >= :low"
+        if high is not None:
+            condition += f" AND {field} {'<=' if include_high else '<'} :high"
+        ids = db.execute(text(f"SELECT id FROM locations WHERE {condition}"), {"low": low, "high": high}).scalars()
+        return ids_to_bitmap(ids, self.size)
+
+    def range_bitmap(self, db, field: str, low: Optional[float] = None, high: Optional[float] = None) -> int:
+        """
+        Bitmap de low <= campo <= high; nulos nunca entram, como no SQL
+        """
+        grid, below = RANGE_GRIDS[field], self.below[field]
+        result = self.not_null[field]
+        if low is not None:
+            index = bisect_left(grid, low)
+            if index == len(grid):
+                result = self._slice(db, field, low, None)
+            else:
+                point = grid[index]
+                result &= ~below[point]
+                if point > low:
+                    result |= self._slice(db, field, low, point)
+        if high is not None:
+            index = bisect_right(grid, high) - 1
+            upper = self._slice(db, field, grid[index] if index >= 0 else high, high, include_high=True)
+            if index >= 0:
+                upper |= below[grid[index]]
+            result &= upper
+        return result
+
+    def result_bitmap(
+        self,
+        db,
+        q: Optional[str] = None,
+        city: Optional[str] = None,
+        status: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_capacity: Optional[int] = None,
+        lat: Optional[float] = None,
+        lng: Optional[float] = None,
+        radius_km: Optional[float] = None,
+        bbox=None,
+    ) -> int:
+        """
+        Bitmap das locações que casam com a busca (mesmos parâmetros de search_locations)
+
+        Área: o R*Tree/GiST já aplica todos os filtros. Texto: só os ids do
+        índice invertido vêm do banco; os demais filtros são ANDs de bitmaps.
+        """
+        if lat is not None or lng is not None or bbox:
+            sql, params = matching_ids_query(
+                db, q=q, city=city, status=status, min_price=min_price, max_price=max_price,
+                min_capacity=min_capacity, lat=lat, lng=lng, radius_km=radius_km, bbox=bbox,
+            )
+            return ids_to_bitmap(db.execute(text(sql), params).scalars(), self.size)
+
+        result = self.all
+        if q:
+            sql, params = matching_ids_query(db, q=q)
+            result = ids_to_bitmap(db.execute(text(sql), params).scalars(), self.size)
+        if city:
+            result &= self.bitmaps["city"].get(city, 0)
+        if status:
+            result &= self.bitmaps["status"].get(status, 0)
+        if min_price is not None or max_price is not None:
+            result &= self.range_bitmap(db, "price_day_cinema", min_price, max_price)
+        if min_capacity is not None:
+            result &= self.range_bitmap(db, "capacity", min_capacity)
+        return result
+
+    def counts(self, result: int) -> dict:
+        """
+        {faceta: {valor: quantidade}}; valores sem resultados são omitidos
+        """
+        facets = {}
+        for facet, values in self.bitmaps.items():
+            counts = {value: popcount(result & bitmap) for value, bitmap in values.items()}
+            counts = {value: count for value, count in counts.items() if count}
+            if facet not in ("price", "capacity"):
+                counts = dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+            facets[facet] = counts
+        return facets
+
+
+facet_index = FacetIndex()
+
+
+def search_facets(db, **search) -> dict:
+    """
+    Contagens por faceta do conjunto inteiro de resultados da busca (não só da página)
+
+    Aceita os filtros de search_locations (q, city, status, faixas de diária e
+    capacidade, lat/lng/radius_km, bbox).
+    """
+    facet_index.ensure(db)
+    return facet_index.counts(facet_index.result_bitmap(db, **search))
+
+
+def search_with_facets(db, limit: int = 20, offset: int = 0, **search) -> dict:
+    """
+    Resposta de /api/v1/locations/search com `facets` ao lado de items/total
+
+    `facets_approximate` indica contagens de bitmaps anteriores à última
+    escrita (reconstrução em andamento) ou que não batem com `total`.
+    """
+    result = search_locations(db, limit=limit, offset=offset, **search)
+    facet_index.ensure(db)
+    matched = facet_index.result_bitmap(db, **search)
+    result["facets"] = facet_index.counts(matched)
+
+    drifted = not result["total_capped"] and popcount(matched) != result["total"]
+    if drifted:
+        # Escrita fora dos engines observados: reconstruir em background
+        facet_index.invalidate()
+        facet_index.ensure(db)
+    result["facets_approximate"] = drifted or facet_index.stale
+    return result
@@ -0,0 +1,273 @@
+import base64
+import json
+from typing import Optional
+
+from sqlalchemy import bindparam, text
+
+from location_search import dialect_name, location_filters
+
+# Ordenações de GET /api/v1/locations ("-" = decrescente); id desempata e fecha a chave
+SORT_FIELDS = ("created_at", "updated_at", "title", "price_day_cinema", "capacity", "id")
+NULLABLE_SORT_FIELDS = ("price_day_cinema", "capacity")
+DEFAULT_SORT = "-created_at"
+
+# Campos da listagem sem `fields=`; colunas pesadas só entram se pedidas
+LIST_FIELDS = (
+    "id", "title", "slug", "summary", "status", "city", "state", "neighborhood", "sector_type",
+    "space_type", "price_day_cinema", "capacity", "cover_photo_url", "created_at", "updated_at",
+)
+LIST_COLUMNS = ", ".join(f"l.{field}" for field in LIST_FIELDS)
+
+# Aceitos em `fields=`; search_vector é interno e nunca é devolvido
+SELECTABLE_FIELDS = LIST_FIELDS + (
+    "description", "availability_json", "address_json", "accessibility_features", "street", "number",
+    "postal_code", "country", "geo_point", "price_hour_cinema", "price_day_publicidade",
+    "price_hour_publicidade", "currency", "area_size", "parking_spots", "noise_level", "supplier_id",
+    "project_id", "meta_title", "meta_description",
+)
+
+# Relações de `include=`, cada uma carregada com uma única consulta IN por página
+INCLUDES = ("tags", "primary_photo", "supplier")
+
+MAX_LIMIT = 500
+
+
+def listing_index_statements(db) -> list:
+    """
+    Índices (campo, id) que deixam cada ordenação e o seek do cursor dentro do índice
+
+    NULL conta como o menor valor nos dois bancos (padrão do SQLite; no
+    PostgreSQL o índice precisa de NULLS FIRST para o ORDER BY usá-lo).
+    """
+    nulls = " NULLS FIRST" if dialect_name(db) == "postgresql" else ""
+    return [
+        f"CREATE INDEX IF NOT EXISTS ix_locations_{field}_id ON locations ({field}{nulls}, id)"
+        for field in SORT_FIELDS if field != "id"
+    ] + [
+        # include=tags usa ix_location_tags_location_id (location_search.py)
+        "CREATE INDEX IF NOT EXISTS ix_location_photos_location_id ON location_photos (location_id)",
+    ]
+
+
+def setup_listing_indexes(db):
+    for statement in listing_index_statements(db):
+        db.execute(text(statement))
+    db.commit()
+
+
+def parse_sort(sort: Optional[str]) -> tuple:
+    """
+    "-created_at" -> ("created_at", True); campos fora de SORT_FIELDS são rejeitados
+    """
+    sort = sort or DEFAULT_SORT
+    field, descending = sort.lstrip("-"), sort.startswith("-")
+    if field not in SORT_FIELDS:
+        raise ValueError(f"Ordenação inválida: {sort} (use {', '.join(SORT_FIELDS)}, com '-' para decrescente)")
+    return field, descending
+
+
+def parse_list_param(value, allowed: tuple, name: str) -> tuple:
+    """
+    "a,b" ou ["a", "b"] -> ("a", "b"); valores fora de `allowed` são rejeitados
+    """
+    if not value:
+        return ()
+    items = value.split(",") if isinstance(value, str) else value
+    items = tuple(dict.fromkeys(item.strip() for item in items if item.strip()))
+    unknown = [item for item in items if item not in allowed]
+    if unknown:
+        raise ValueError(f"{name} inválido: {', '.join(unknown)} (use {', '.join(allowed)})")
+    return items
+
+
+def encode_cursor(sort: str, value, location_id: int) -> str:
+    payload = json.dumps({"s": sort, "v": value, "id": location_id}, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """
+    Cursor opaco -> (último valor da ordenação, último id); ValueError se inválido ou de outra ordenação
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, location_id = payload["v"], int(payload["id"])
+        cursor_sort = payload["s"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Cursor inválido")
+    if cursor_sort != sort:
+        raise ValueError("Cursor gerado para outra ordenação")
+    return value, location_id
+
+
+def keyset_clause(field: str, descending: bool, value) -> str:
+    """
+    Linhas depois de (value, :cursor_id) na ordem (field, id), com NULL como menor valor
+    """
+    column = f"l.{field}"
+    if field == "id":
+        return f"l.id {'<' if descending else '>'} :cursor_id"
+    if value is None:
+        if descending:
+            return f"{column} IS NULL AND l.id < :cursor_id"
+        return f"(({column} IS NULL AND l.id > :cursor_id) OR {column} IS NOT NULL)"
+    if descending:
+        after = f"({column}, l.id) < (:cursor_value, :cursor_id)"
+        return f"({after} OR {column} IS NULL)" if field in NULLABLE_SORT_FIELDS else after
+    return f"({column}, l.id) > (:cursor_value, :cursor_id)"
+
+
+def order_clause(db, field: str, descending: bool) -> str:
+    if field == "id":
+        return f"l.id {'DESC' if descending else 'ASC'}"
+    direction = "DESC" if descending else "ASC"
+    nulls = ""
+    if dialect_name(db) == "postgresql" and field in NULLABLE_SORT_FIELDS:
+        nulls = " NULLS LAST" if descending else " NULLS FIRST"
+    return f"l.{field} {direction}{nulls}, l.id {direction}"
+
+
+def _in_query(sql: str, ids) -> tuple:
+    return text(sql).bindparams(bindparam("ids", expanding=True)), {"ids": list(ids)}
+
+
+def load_tags(db, location_ids) -> dict:
+    """
+    {location_id: [tags]} de todas as locações numa consulta
+    """
+    statement, params = _in_query(
+        "SELECT lt.location_id, t.id, t.name, t.kind, t.color FROM location_tags lt "
+        "JOIN tags t ON t.id = lt.tag_id WHERE lt.location_id IN :ids ORDER BY lt.location_id, t.name",
+        location_ids,
+    )
+    tags = {}
+    for location_id, tag_id, name, kind, color in db.execute(statement, params):
+        location_tags = tags.setdefault(location_id, [])
+        # location_tags pode repetir o par (locação, tag)
+        if not location_tags or location_tags[-1]["id"] != tag_id:
+            location_tags.append({"id": tag_id, "name": name, "kind": kind, "color": color})
+    return tags
+
+
+def load_primary_photos(db, location_ids) -> dict:
+    """
+    {location_id: foto} com a foto principal (is_primary, depois sort_order) de cada locação
+    """
+    statement, params = _in_query(
+        "SELECT location_id, id, url, thumbnail_path, caption, width, height FROM ("
+        "SELECT p.*, ROW_NUMBER() OVER (PARTITION BY p.location_id "
+        "ORDER BY CASE WHEN p.is_primary THEN 0 ELSE 1 END, p.sort_order, p.id) AS position "
+        "FROM location_photos p WHERE p.location_id IN :ids) ranked WHERE position = 1",
+        location_ids,
+    )
+    return {row["location_id"]: dict(row) for row in db.execute(statement, params).mappings()}
+
+
+def load_suppliers(db, supplier_ids) -> dict:
+    statement, params = _in_query(
+        "SELECT id, name, email, phone, website, rating FROM suppliers WHERE id IN :ids", supplier_ids,
+    )
+    return {row["id"]: dict(row) for row in db.execute(statement, params).mappings()}
+
+
+def attach_includes(db, items: list, include: tuple, supplier_ids: dict):
+    """
+    Preenche as relações pedidas em `include` com uma consulta IN por relação (nunca uma por linha)
+
+    `supplier_ids` mapeia location_id -> supplier_id, já lido junto com a página.
+    """
+    location_ids = [item["id"] for item in items]
+    if not location_ids:
+        return
+    if "tags" in include:
+        tags = load_tags(db, location_ids)
+        for item in items:
+            item["tags"] = tags.get(item["id"], [])
+    if "primary_photo" in include:
+        photos = load_primary_photos(db, location_ids)
+        for item in items:
+            photo = photos.get(item["id"])
+            if photo:
+                photo.pop("location_id")
+            item["primary_photo"] = photo
+    if "supplier" in include:
+        wanted = {supplier_id for supplier_id in supplier_ids.values() if supplier_id is not None}
+        suppliers = load_suppliers(db, wanted) if wanted else {}
+        for item in items:
+            item["supplier"] = suppliers.get(supplier_ids.get(item["id"]))
+
+
+def list_locations(
+    db,
+    skip: int = 0,
+    limit: int = 100,
+    page: Optional[int] = None,
+    page_size: Optional[int] = None,
+    status: Optional[str] = None,
+    city: Optional[str] = None,
+    sort: Optional[str] = None,
+    cursor: Optional[str] = None,
+    include=None,
+    fields=None,
+) -> dict:
+    """
+    Listagem de GET /api/v1/locations em modo cursor (keyset) ou offset
+
+    Com `cursor`, a página começa logo após a última linha da anterior usando
+    o índice (campo, id): o custo não cresce com a profundidade. Sem cursor,
+    mantém skip/limit ou page/page_size (OFFSET) por compatibilidade. Os dois
+    modos devolvem `next_cursor` (None na última página); só o modo offset
+    devolve `total`.
+
+    `fields` ("id,title,city") restringe as colunas lidas; `include`
+    ("tags,primary_photo,supplier") carrega as relações em lote, então o número
+    de consultas não depende do tamanho da página.
+    """
+    sort = sort or DEFAULT_SORT
+    field, descending = parse_sort(sort)
+    include = parse_list_param(include, INCLUDES, "include")
+    fields = parse_list_param(fields, SELECTABLE_FIELDS, "fields") or LIST_FIELDS
+    # id, o campo da ordenação (cursor) e supplier_id (include=supplier) são lidos mesmo fora de `fields`
+    internal = ("id", field) + (("supplier_id",) if "supplier" in include else ())
+    columns = tuple(dict.fromkeys(fields + internal))
+    if page is not None or page_size is not None:
+        page_size = page_size or 12
+        limit, skip = page_size, (max(page or 1, 1) - 1) * page_size
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    clauses, params = location_filters(city, status)
+    total = None
+    if cursor:
+        value, cursor_id = decode_cursor(cursor, sort)
+        clauses.append(keyset_clause(field, descending, value))
+        params.update(cursor_value=value, cursor_id=cursor_id)
+        skip = 0
+    else:
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        total = db.execute(text(f"SELECT COUNT(*) FROM locations l {where}"), params).scalar()
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    rows = db.execute(
+        text(
+            f"SELECT {', '.join(f'l.{column}' for column in columns)} FROM locations l {where} "
+            f"ORDER BY {order_clause(db, field, descending)} LIMIT :limit OFFSET :offset"
+        ),
+        {**params, "limit": limit + 1, "offset": skip},
+    ).mappings().all()
+
+    # Uma linha a mais indica que existe próxima página
+    page_rows = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(sort, page_rows[-1][field], page_rows[-1]["id"])
+
+    items = [{key: row[key] for key in ("id",) + fields} for row in page_rows]
+    if include:
+        supplier_ids = {row["id"]: row["supplier_id"] for row in page_rows} if "supplier" in include else {}
+        attach_includes(db, items, include, supplier_ids)
+
+    result = {"items": items, "next_cursor": next_cursor}
+    if total is not None:
+        result["total"] = total
+    return result
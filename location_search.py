@@ -0,0 +1,651 @@
+import math
+import re
+import unicodedata
+from typing import Optional
+
+from sqlalchemy import text
+
+# Pesos por campo: título e tags pesam mais que a descrição longa
+SEARCH_FIELDS = ("title", "summary", "description", "neighborhood", "city", "tags", "supplier_name")
+BM25_WEIGHTS = (10.0, 2.0, 1.0, 3.0, 3.0, 5.0, 2.0)
+
+RESULT_COLUMNS = (
+    "l.id, l.title, l.summary, l.city, l.state, l.neighborhood, l.status, l.sector_type, l.space_type, "
+    "l.price_day_cinema, l.capacity"
+)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+_TAGS_OF = (
+    "(SELECT group_concat(t.name, ' ') FROM location_tags lt JOIN tags t ON t.id = lt.tag_id "
+    "WHERE lt.location_id = {location_id})"
+)
+
+# Pesos persistidos no índice: `ORDER BY rank` usa o BM25 ponderado sem recalcular na consulta
+SQLITE_RANK = "INSERT INTO locations_fts (locations_fts, rank) VALUES ('rank', 'bm25({weights})')".format(
+    weights=", ".join(str(weight) for weight in BM25_WEIGHTS)
+)
+
+SQLITE_SETUP = [
+    # Os gatilhos e a reconstrução buscam as tags de cada locação
+    "CREATE INDEX IF NOT EXISTS ix_location_tags_location_id ON location_tags (location_id)",
+    # Filtros de faixa fora da área geográfica (e fatias fora da grade em location_facets.py)
+    "CREATE INDEX IF NOT EXISTS ix_locations_price_day_cinema ON locations (price_day_cinema)",
+    "CREATE INDEX IF NOT EXISTS ix_locations_capacity ON locations (capacity)",
+    # Índice invertido separado; rowid = locations.id
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS locations_fts USING fts5(
+        title, summary, description, neighborhood, city, tags, supplier_name,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+    """,
+    SQLITE_RANK,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS locations_fts_insert AFTER INSERT ON locations BEGIN
+        INSERT INTO locations_fts (rowid, title, summary, description, neighborhood, city, tags, supplier_name)
+        VALUES (NEW.id, NEW.title, NEW.summary, NEW.description, NEW.neighborhood, NEW.city,
+                {_TAGS_OF.format(location_id='NEW.id')}, NEW.supplier_name);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS locations_fts_update
+    AFTER UPDATE OF title, summary, description, neighborhood, city, supplier_name ON locations BEGIN
+        DELETE FROM locations_fts WHERE rowid = OLD.id;
+        INSERT INTO locations_fts (rowid, title, summary, description, neighborhood, city, tags, supplier_name)
+        VALUES (NEW.id, NEW.title, NEW.summary, NEW.description, NEW.neighborhood, NEW.city,
+                {_TAGS_OF.format(location_id='NEW.id')}, NEW.supplier_name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS locations_fts_delete AFTER DELETE ON locations BEGIN
+        DELETE FROM locations_fts WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS locations_fts_tag_insert AFTER INSERT ON location_tags BEGIN
+        UPDATE locations_fts SET tags = {_TAGS_OF.format(location_id='NEW.location_id')}
+        WHERE rowid = NEW.location_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS locations_fts_tag_delete AFTER DELETE ON location_tags BEGIN
+        UPDATE locations_fts SET tags = {_TAGS_OF.format(location_id='OLD.location_id')}
+        WHERE rowid = OLD.location_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS locations_fts_tag_rename AFTER UPDATE OF name ON tags BEGIN
+        UPDATE locations_fts SET tags = {_TAGS_OF.format(location_id='locations_fts.rowid')}
+        WHERE rowid IN (SELECT location_id FROM location_tags WHERE tag_id = NEW.id);
+    END
+    """,
+]
+
+SQLITE_REBUILD = [
+    "DELETE FROM locations_fts",
+    f"""
+    INSERT INTO locations_fts (rowid, title, summary, description, neighborhood, city, tags, supplier_name)
+    SELECT l.id, l.title, l.summary, l.description, l.neighborhood, l.city,
+           {_TAGS_OF.format(location_id='l.id')}, l.supplier_name
+    FROM locations l
+    """,
+    "INSERT INTO locations_fts (locations_fts) VALUES ('optimize')",
+]
+
+POSTGRES_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE INDEX IF NOT EXISTS ix_location_tags_location_id ON location_tags (location_id)",
+    # Filtros de faixa fora da área geográfica (e fatias fora da grade em location_facets.py)
+    "CREATE INDEX IF NOT EXISTS ix_locations_price_day_cinema ON locations (price_day_cinema)",
+    "CREATE INDEX IF NOT EXISTS ix_locations_capacity ON locations (capacity)",
+    """
+    DO $$ BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'pt_unaccent') THEN
+            CREATE TEXT SEARCH CONFIGURATION pt_unaccent (COPY = portuguese);
+            ALTER TEXT SEARCH CONFIGURATION pt_unaccent
+                ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+        END IF;
+    END $$
+    """,
+    """
+    DO $$ BEGIN
+        IF (SELECT data_type FROM information_schema.columns
+            WHERE table_name = 'locations' AND column_name = 'search_vector') <> 'tsvector' THEN
+            ALTER TABLE locations ALTER COLUMN search_vector TYPE tsvector USING NULL;
+        END IF;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION cinema_location_search_vector(loc locations) RETURNS tsvector AS $$
+        SELECT setweight(to_tsvector('pt_unaccent', coalesce(loc.title, '')), 'A')
+            || setweight(to_tsvector('pt_unaccent', coalesce((
+                   SELECT string_agg(t.name, ' ') FROM location_tags lt JOIN tags t ON t.id = lt.tag_id
+                   WHERE lt.location_id = loc.id), '')), 'A')
+            || setweight(to_tsvector('pt_unaccent',
+                   coalesce(loc.neighborhood, '') || ' ' || coalesce(loc.city, '')), 'B')
+            || setweight(to_tsvector('pt_unaccent',
+                   coalesce(loc.summary, '') || ' ' || coalesce(loc.supplier_name, '')), 'C')
+            || setweight(to_tsvector('pt_unaccent', coalesce(loc.description, '')), 'D')
+    $$ LANGUAGE sql STABLE
+    """,
+    """
+    CREATE OR REPLACE FUNCTION cinema_locations_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector := cinema_location_search_vector(NEW);
+        RETURN NEW;
+    END $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS locations_search_vector ON locations",
+    """
+    CREATE TRIGGER locations_search_vector BEFORE INSERT OR UPDATE OF
+        title, summary, description, neighborhood, city, supplier_name ON locations
+    FOR EACH ROW EXECUTE FUNCTION cinema_locations_search_trigger()
+    """,
+    """
+    CREATE OR REPLACE FUNCTION cinema_location_tags_search_trigger() RETURNS trigger AS $$
+    BEGIN
+        UPDATE locations l SET search_vector = cinema_location_search_vector(l)
+        WHERE l.id = COALESCE(NEW.location_id, OLD.location_id);
+        RETURN NULL;
+    END $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS location_tags_search_vector ON location_tags",
+    """
+    CREATE TRIGGER location_tags_search_vector AFTER INSERT OR DELETE ON location_tags
+    FOR EACH ROW EXECUTE FUNCTION cinema_location_tags_search_trigger()
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_locations_search_vector ON locations USING GIN (search_vector)",
+]
+
+POSTGRES_REBUILD = [
+    "UPDATE locations l SET search_vector = cinema_location_search_vector(l)",
+]
+
+
+# geo_point guarda WKT "POINT(lng lat)"; extração em SQL puro para os gatilhos do SQLite
+_POINT_LNG = "CAST(substr({g}, 7, instr({g}, ' ') - 7) AS REAL)"
+_POINT_LAT = "CAST(substr({g}, instr({g}, ' ') + 1, length({g}) - instr({g}, ' ') - 1) AS REAL)"
+
+_GEO_ROW = (
+    "SELECT {row}.id, {lat}, {lat}, {lng}, {lng}, "
+    "coalesce({row}.price_day_cinema, -1), coalesce({row}.price_day_cinema, -1), "
+    "coalesce({row}.capacity, -1), coalesce({row}.capacity, -1), {row}.city, {row}.status "
+    "{source}WHERE {row}.geo_point LIKE 'POINT(%'"
+)
+
+
+def _geo_row(row: str, source: str = "") -> str:
+    point = f"{row}.geo_point"
+    return _GEO_ROW.format(
+        row=row, source=source, lat=_POINT_LAT.format(g=point), lng=_POINT_LNG.format(g=point)
+    )
+
+
+# R*Tree com diária e capacidade como dimensões extras (raio + faixas numa única descida
+# do índice; nulos viram -1) e cidade/status como colunas auxiliares: a busca geográfica
+# filtra, ordena e conta sem ler a tabela locations.
+SQLITE_GEO_SETUP = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS locations_geo USING rtree(
+        id, min_lat, max_lat, min_lng, max_lng, min_price, max_price, min_capacity, max_capacity,
+        +city, +status
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS locations_geo_insert AFTER INSERT ON locations BEGIN
+        INSERT INTO locations_geo {_geo_row('NEW')};
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS locations_geo_update
+    AFTER UPDATE OF geo_point, price_day_cinema, capacity, city, status ON locations BEGIN
+        DELETE FROM locations_geo WHERE id = OLD.id;
+        INSERT INTO locations_geo {_geo_row('NEW')};
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS locations_geo_delete AFTER DELETE ON locations BEGIN
+        DELETE FROM locations_geo WHERE id = OLD.id;
+    END
+    """,
+]
+
+# Carga agrupada por células de 0,1° (~11 km): inserida na ordem dos ids, a árvore 4D
+# mistura regiões distantes nos mesmos nós e fica ~10x mais lenta em raios pequenos
+SQLITE_GEO_REBUILD = [
+    "DELETE FROM locations_geo",
+    f"INSERT INTO locations_geo {_geo_row('l', source='FROM locations l ')} "
+    f"ORDER BY CAST({_POINT_LAT.format(g='l.geo_point')} * 10 AS INTEGER), "
+    f"CAST({_POINT_LNG.format(g='l.geo_point')} * 10 AS INTEGER)",
+]
+
+POSTGRES_GEO_SETUP = [
+    "CREATE EXTENSION IF NOT EXISTS postgis",
+    """
+    ALTER TABLE locations ADD COLUMN IF NOT EXISTS geo geography(Point, 4326)
+    GENERATED ALWAYS AS (
+        CASE WHEN geo_point LIKE 'POINT(%' THEN ST_GeogFromText('SRID=4326;' || geo_point) END
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_locations_geo ON locations USING GIST (geo)",
+]
+
+# Coluna gerada: mantida pelo próprio PostgreSQL, nada a reconstruir
+POSTGRES_GEO_REBUILD = []
+
+KM_PER_DEGREE = 111.195
+DEFAULT_RADIUS_KM = 10.0
+
+POSTGRES_CENTER = "CAST(ST_SetSRID(ST_MakePoint(:lng, :lat), 4326) AS geography)"
+
+# Distância² em graus (equirretangular): suficiente para raios urbanos, sem funções matemáticas
+SQLITE_DISTANCE2 = "((g.min_lat - :lat) * (g.min_lat - :lat) + (g.min_lng - :lng) * (g.min_lng - :lng) * :lng_scale2)"
+
+# Anéis da busca por raio no SQLite (frações do raio pedido), do mais próximo ao completo
+GEO_RINGS = (1 / 16, 1 / 4, 1.0)
+
+
+def fold_accents(value: str) -> str:
+    """
+    Remove acentos e normaliza caixa ("Estúdio São João" -> "estudio sao joao")
+    """
+    decomposed = unicodedata.normalize("NFKD", value)
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+
+FTS_MATCH = "locations_fts MATCH :query"
+
+# Termos mais curtos casam só a palavra exata: "pr"* expandiria para quase todo o índice
+MIN_PREFIX_LENGTH = 3
+
+# Acima disso o total é informado como "pelo menos N" (total_capped) em vez de contado
+MAX_COUNT = 10000
+
+
+def search_terms(q: str) -> list:
+    return _TOKEN.findall(fold_accents(q or ""))
+
+
+def fts5_query(q: str) -> Optional[str]:
+    """
+    Consulta FTS5 com todos os termos obrigatórios e casamento por prefixo
+    ("casa pra" -> "casa"* AND "pra"*)
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+    return " AND ".join(f'"{term}"*' if len(term) >= MIN_PREFIX_LENGTH else f'"{term}"' for term in terms)
+
+
+def tsquery(q: str) -> Optional[str]:
+    """
+    Equivalente para to_tsquery do PostgreSQL ("casa pra" -> casa:* & pra:*)
+    """
+    terms = search_terms(q)
+    if not terms:
+        return None
+    return " & ".join(f"{term}:*" if len(term) >= MIN_PREFIX_LENGTH else term for term in terms)
+
+
+def dialect_name(db) -> str:
+    bind = db.get_bind() if hasattr(db, "get_bind") else db
+    return bind.dialect.name
+
+
+def setup_search_index(db, rebuild: bool = True):
+    """
+    Cria os índices de busca (FTS5/R*Tree ou tsvector + GIN/GiST) e os gatilhos de atualização incremental
+    """
+    postgres = dialect_name(db) == "postgresql"
+    statements = POSTGRES_SETUP + POSTGRES_GEO_SETUP if postgres else SQLITE_SETUP + SQLITE_GEO_SETUP
+    if rebuild:
+        statements = statements + (
+            POSTGRES_REBUILD + POSTGRES_GEO_REBUILD if postgres else SQLITE_REBUILD + SQLITE_GEO_REBUILD
+        )
+    for statement in statements:
+        db.execute(text(statement))
+    db.commit()
+
+
+def rebuild_search_index(db):
+    """
+    Reconstrói o índice inteiro (após cargas em lote feitas com os gatilhos desativados)
+    """
+    postgres = dialect_name(db) == "postgresql"
+    for statement in POSTGRES_REBUILD + POSTGRES_GEO_REBUILD if postgres else SQLITE_REBUILD + SQLITE_GEO_REBUILD:
+        db.execute(text(statement))
+    db.commit()
+
+
+def location_filters(
+    city: Optional[str] = None,
+    status: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_capacity: Optional[int] = None,
+) -> tuple:
+    """
+    Cláusulas WHERE (sobre o alias l) e parâmetros dos filtros da busca
+    """
+    clauses, params = [], {}
+    if city:
+        clauses.append("l.city = :city")
+        params["city"] = city
+    if status:
+        clauses.append("l.status = :status")
+        params["status"] = status
+    if min_price is not None:
+        clauses.append("l.price_day_cinema >= :min_price")
+        params["min_price"] = min_price
+    if max_price is not None:
+        clauses.append("l.price_day_cinema <= :max_price")
+        params["max_price"] = max_price
+    if min_capacity is not None:
+        clauses.append("l.capacity >= :min_capacity")
+        params["min_capacity"] = min_capacity
+    return clauses, params
+
+
+def parse_bbox(value) -> Optional[tuple]:
+    """
+    "min_lng,min_lat,max_lng,max_lat" (ordem do GeoJSON) -> tupla de floats
+    """
+    if not value:
+        return None
+    if isinstance(value, str):
+        value = value.split(",")
+    min_lng, min_lat, max_lng, max_lat = (float(part) for part in value)
+    if min_lng > max_lng or min_lat > max_lat:
+        raise ValueError("bbox inválido: mínimos maiores que máximos")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def _ring_params(lat: float, lng: float, radius_km: float) -> dict:
+    """
+    Caixa envolvente e raio² (em graus, projeção equirretangular) de um círculo
+    """
+    lng_scale = math.cos(math.radians(lat))
+    delta_lat = radius_km / KM_PER_DEGREE
+    delta_lng = delta_lat / max(lng_scale, 1e-6)
+    return {
+        "ring_min_lat": lat - delta_lat, "ring_max_lat": lat + delta_lat,
+        "ring_min_lng": lng - delta_lng, "ring_max_lng": lng + delta_lng,
+        "ring_radius2": delta_lat * delta_lat, "lng_scale2": lng_scale * lng_scale,
+    }
+
+
+def sqlite_geo_filters(
+    bbox: Optional[tuple] = None,
+    city: Optional[str] = None,
+    status: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_capacity: Optional[int] = None,
+) -> list:
+    """
+    Restrições sobre o R*Tree (alias g)
+
+    O R*Tree guarda float32 (mínimo arredondado para baixo, máximo para cima):
+    acima de 2^24 / ~131 mil com centavos, [g.min, g.max] só envolve o valor
+    real. O que a caixa decide fica no índice; só as linhas em que o limite do
+    filtro cai dentro dela consultam locations pela chave primária.
+    """
+    clauses = [
+        "g.min_lat >= :ring_min_lat", "g.max_lat <= :ring_max_lat",
+        "g.min_lng >= :ring_min_lng", "g.max_lng <= :ring_max_lng",
+        f"{SQLITE_DISTANCE2} <= :ring_radius2",
+    ]
+    if bbox:
+        clauses += [
+            "g.min_lat >= :bbox_min_lat", "g.max_lat <= :bbox_max_lat",
+            "g.min_lng >= :bbox_min_lng", "g.max_lng <= :bbox_max_lng",
+        ]
+    if city:
+        clauses.append("g.city = :city")
+    if status:
+        clauses.append("g.status = :status")
+    if min_price is not None:
+        clauses += ["g.max_price >= :min_price", _recheck("g.min_price >= :min_price", "price_day_cinema >= :min_price")]
+    if max_price is not None:
+        # min_price >= 0 descarta as diárias nulas (-1), como faria o SQL sobre locations
+        clauses += [
+            "g.min_price >= 0", "g.min_price <= :max_price",
+            _recheck("g.max_price <= :max_price", "price_day_cinema <= :max_price"),
+        ]
+    if min_capacity is not None:
+        clauses += [
+            "g.max_capacity >= :min_capacity",
+            _recheck("g.min_capacity >= :min_capacity", "capacity >= :min_capacity"),
+        ]
+    return clauses
+
+
+def _recheck(certain: str, exact: str) -> str:
+    """
+    `certain` no índice ou, na faixa de arredondamento do float32, `exact` na linha de locations
+    """
+    return f"({certain} OR (SELECT {exact} FROM locations WHERE id = g.id))"
+
+
+def count_capped(db, sql: str, params: dict) -> tuple:
+    """
+    Conta as linhas de `sql` até MAX_COUNT + 1; retorna (total, total_capped)
+    """
+    total = db.execute(
+        text(f"SELECT COUNT(*) FROM ({sql} LIMIT {MAX_COUNT + 1}) counted"), params
+    ).scalar()
+    return min(total, MAX_COUNT), total > MAX_COUNT
+
+
+def resolve_area(lat=None, lng=None, radius_km=None, bbox=None) -> tuple:
+    """
+    Normaliza a área da busca; retorna (lat, lng, radius_km, bbox)
+
+    Só com `bbox`, o centro é o da caixa e o raio fica em aberto (a caixa limita).
+    """
+    if (lat is None) != (lng is None):
+        raise ValueError("lat e lng devem ser informados juntos")
+    bbox = parse_bbox(bbox)
+    if lat is None and bbox:
+        lat, lng = (bbox[1] + bbox[3]) / 2, (bbox[0] + bbox[2]) / 2
+    elif lat is not None and radius_km is None:
+        radius_km = DEFAULT_RADIUS_KM
+    return lat, lng, radius_km, bbox
+
+
+def sqlite_geo_source(query: Optional[str], lat: float, lng: float, radius_km: Optional[float], bbox, **filters) -> tuple:
+    """
+    FROM/WHERE da busca geográfica no R*Tree (alias g); retorna (source, where, score, params, radius_km)
+    """
+    if radius_km is None:
+        # Só a caixa: o círculo circunscreve a caixa inteira
+        half_lat = (bbox[3] - bbox[1]) / 2
+        half_lng = (bbox[2] - bbox[0]) / 2 * math.cos(math.radians(lat))
+        radius_km = math.hypot(half_lat, half_lng) * KM_PER_DEGREE * 1.01
+
+    clauses = sqlite_geo_filters(bbox, **filters)
+    params = {name: value for name, value in filters.items() if value is not None}
+    params.update(lat=lat, lng=lng, **_ring_params(lat, lng, radius_km))
+    if bbox:
+        params.update(zip(("bbox_min_lng", "bbox_min_lat", "bbox_max_lng", "bbox_max_lat"), bbox))
+    source = "locations_geo g"
+    score = "0.0"
+    if query:
+        source += " JOIN locations_fts ON locations_fts.rowid = g.id"
+        clauses.insert(0, FTS_MATCH)
+        score = "-locations_fts.rank"
+        params["query"] = query
+    return source, " AND ".join(clauses), score, params, radius_km
+
+
+def sqlite_geo_search(
+    db,
+    query: Optional[str],
+    lat: float,
+    lng: float,
+    radius_km: Optional[float],
+    bbox: Optional[tuple],
+    limit: int,
+    offset: int,
+    **filters,
+) -> dict:
+    """
+    Busca por raio/caixa no R*Tree, ordenada por distância
+
+    Filtros, ordenação e contagem rodam só no índice; de locations são lidas
+    apenas as linhas da página. Anéis crescentes (GEO_RINGS): se o anel menor
+    já enche a página, ela é exata (tudo fora dele está mais longe).
+    """
+    source, where, score, params, radius_km = sqlite_geo_source(query, lat, lng, radius_km, bbox, **filters)
+    params.update(limit=limit, offset=offset)
+
+    page = (
+        f"SELECT g.id, {score} AS score, {SQLITE_DISTANCE2} AS distance FROM {source} WHERE {where} "
+        "ORDER BY distance, g.id LIMIT :limit OFFSET :offset"
+    )
+    sql = f"SELECT {RESULT_COLUMNS}, p.score, p.distance FROM ({page}) p JOIN locations l ON l.id = p.id ORDER BY p.distance, p.id"
+    # Com texto o FTS5 conduz a junção e cada anel repetiria a varredura: um anel só
+    for fraction in GEO_RINGS if not query else GEO_RINGS[-1:]:
+        params.update(_ring_params(lat, lng, radius_km * fraction))
+        rows = db.execute(text(sql), params).mappings().all()
+        if len(rows) >= limit:
+            break
+    params.update(_ring_params(lat, lng, radius_km))
+    total, capped = count_capped(db, f"SELECT 1 FROM {source} WHERE {where}", params)
+
+    items = []
+    for row in rows:
+        item = dict(row)
+        item["distance_km"] = round(math.sqrt(item.pop("distance")) * KM_PER_DEGREE, 3)
+        items.append(item)
+    return {"items": items, "total": total, "total_capped": capped}
+
+
+def search_source(db, q=None, lat=None, lng=None, radius_km=None, bbox=None, **filters) -> tuple:
+    """
+    FROM/WHERE da busca sobre locations (alias l), exceto o caminho geográfico do SQLite
+
+    Retorna (query, source, clauses, score, distance, params); a área já deve vir de resolve_area.
+    """
+    clauses, params = location_filters(**filters)
+    distance = ""
+    score = "0.0"
+    source = "locations l"
+
+    if dialect_name(db) == "postgresql":
+        query = tsquery(q)
+        if query:
+            source += ", to_tsquery('pt_unaccent', :query) query"
+            clauses.insert(0, "l.search_vector @@ query")
+            score = "ts_rank_cd(l.search_vector, query)"
+            params["query"] = query
+        if bbox:
+            clauses.append(
+                "l.geo && ST_MakeEnvelope(:bbox_min_lng, :bbox_min_lat, :bbox_max_lng, :bbox_max_lat, 4326)::geography"
+            )
+            params.update(zip(("bbox_min_lng", "bbox_min_lat", "bbox_max_lng", "bbox_max_lat"), bbox))
+        if lat is not None:
+            params.update(lat=lat, lng=lng)
+            distance = f", ST_Distance(l.geo, {POSTGRES_CENTER}) / 1000 AS distance_km"
+            if radius_km is not None:
+                clauses.append(f"ST_DWithin(l.geo, {POSTGRES_CENTER}, :radius_m)")
+                params["radius_m"] = radius_km * 1000
+    else:
+        query = fts5_query(q)
+        if query:
+            source = "locations_fts JOIN locations l ON l.id = locations_fts.rowid"
+            clauses.insert(0, FTS_MATCH)
+            score = "-locations_fts.rank"
+            params["query"] = query
+    return query, source, clauses, score, distance, params
+
+
+def matching_ids_query(
+    db,
+    q: Optional[str] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    bbox=None,
+    **filters,
+) -> tuple:
+    """
+    SELECT dos ids de todas as locações que casam com a busca, sem ordem nem paginação
+
+    Mesmos parâmetros de search_locations; retorna (sql, params).
+    """
+    lat, lng, radius_km, bbox = resolve_area(lat, lng, radius_km, bbox)
+    if lat is not None and dialect_name(db) != "postgresql":
+        source, where, _, params, _ = sqlite_geo_source(fts5_query(q), lat, lng, radius_km, bbox, **filters)
+        return f"SELECT g.id FROM {source} WHERE {where}", params
+    _, source, clauses, _, _, params = search_source(db, q, lat, lng, radius_km, bbox, **filters)
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    return f"SELECT l.id FROM {source} {where}", params
+
+
+def search_locations(
+    db,
+    q: Optional[str] = None,
+    city: Optional[str] = None,
+    status: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_capacity: Optional[int] = None,
+    lat: Optional[float] = None,
+    lng: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    bbox=None,
+    limit: int = 20,
+    offset: int = 0,
+) -> dict:
+    """
+    Busca textual ranqueada (BM25 no SQLite, ts_rank_cd no PostgreSQL) com filtros
+
+    Retorna {"items": [...], "total": N, "total_capped": bool}. Com `lat`/`lng`
+    ou `bbox` ("min_lng,min_lat,max_lng,max_lat") os itens vêm ordenados por
+    distância (campo distance_km) ao centro informado, ou ao centro da caixa,
+    dentro de `radius_km`. Sem `q` nem área, lista as locações filtradas das
+    mais recentes para as mais antigas.
+    """
+    lat, lng, radius_km, bbox = resolve_area(lat, lng, radius_km, bbox)
+    filters = dict(city=city, status=status, min_price=min_price, max_price=max_price, min_capacity=min_capacity)
+    center = lat is not None
+
+    postgres = dialect_name(db) == "postgresql"
+    if center and not postgres:
+        return sqlite_geo_search(db, fts5_query(q), lat, lng, radius_km, bbox, limit, offset, **filters)
+
+    query, source, clauses, score, distance, params = search_source(db, q, lat, lng, radius_km, bbox, **filters)
+    params.update(limit=limit, offset=offset)
+
+    if not postgres and clauses == [FTS_MATCH]:
+        # Sem filtros: top-k direto no índice e JOIN só das linhas da página
+        rows = db.execute(
+            text(
+                f"SELECT {RESULT_COLUMNS}, -f.rank AS score FROM ("
+                "SELECT rowid, rank FROM locations_fts WHERE locations_fts MATCH :query "
+                "ORDER BY rank LIMIT :limit OFFSET :offset"
+                ") f JOIN locations l ON l.id = f.rowid ORDER BY f.rank"
+            ),
+            params,
+        ).mappings().all()
+        total, capped = count_capped(db, "SELECT 1 FROM locations_fts WHERE locations_fts MATCH :query", params)
+        return {"items": [dict(row) for row in rows], "total": total, "total_capped": capped}
+
+    where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+    if center:
+        # KNN no GiST: `<->` percorre o índice já em ordem de distância
+        order = f"l.geo <-> {POSTGRES_CENTER}, l.id"
+    elif query:
+        order = "score DESC, l.id"
+    else:
+        order = "l.created_at DESC, l.id DESC"
+
+    rows = db.execute(
+        text(f"SELECT {RESULT_COLUMNS}, {score} AS score{distance} FROM {source} {where} ORDER BY {order} LIMIT :limit OFFSET :offset"),
+        params,
+    ).mappings().all()
+    total, capped = count_capped(db, f"SELECT 1 FROM {source} {where}", params)
+
+    return {"items": [dict(row) for row in rows], "total": total, "total_capped": capped}
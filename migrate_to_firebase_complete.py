@@ -18,6 +18,12 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 class FullFirebaseMigration:
     """Classe para gerenciar migração completa para Firebase"""
 
+    # Cada tentativa da migração de dados pode rodar por até 1 hora
+    MIGRATION_TIMEOUT = 3600
+    MIGRATION_MAX_ATTEMPTS = 5
+    # A verificação lê todas as coleções do Firestore e tem um prazo próprio
+    VERIFICATION_TIMEOUT = 3600
+
     def __init__(self):
         self.migration_log = []
         self.start_time = datetime.now()
@@ -29,8 +35,8 @@ class FullFirebaseMigration:
         print(log_entry)
         self.migration_log.append(log_entry)
 
-    def run_command(self, command: str, description: str) -> bool:
-        """Executar comando do sistema"""
+    def run_command(self, command: str, description: str, timeout: int = 300) -> bool:
+        """Executar comando do sistema (timeout padrão de 5 minutos)"""
         self.log(f"Executando: {description}")
         self.log(f"Comando: {command}", "DEBUG")
 
@@ -40,7 +46,7 @@ class FullFirebaseMigration:
                 shell=True,
                 capture_output=True,
                 text=True,
-                timeout=300  # 5 minutos timeout
+                timeout=timeout
             )
 
             if result.returncode == 0:
@@ -115,10 +121,26 @@ class FullFirebaseMigration:
         self.log("=" * 60)
 
         try:
-            # Executar migração de dados (já criamos o script)
+            # A primeira execução começa do zero; as seguintes retomam do checkpoint
+            # (migration_checkpoint.json), então um timeout ou uma tabela com erro
+            # (código de saída != 0) não perde o que já foi gravado
+            command = "python migrate_to_firestore.py --batch --skip-verify"
+            for attempt in range(1, self.MIGRATION_MAX_ATTEMPTS + 1):
+                if self.run_command(
+                    command,
+                    f"Migração de dados para Firestore (tentativa {attempt})",
+                    timeout=self.MIGRATION_TIMEOUT
+                ):
+                    break
+                command = "python migrate_to_firestore.py --batch --skip-verify --resume"
+            else:
+                return False
+
+            # Verificação por hashes fora do prazo das tentativas de migração
             return self.run_command(
-                "python migrate_to_firestore.py",
-                "Migração de dados para Firestore"
+                "python migrate_to_firestore.py --verify-only",
+                "Verificação da migração no Firestore",
+                timeout=self.VERIFICATION_TIMEOUT
             )
         except Exception as e:
             self.log(f"Erro na migração de dados: {e}", "ERROR")
@@ -3,25 +3,568 @@
 Script para migrar dados do SQLite para Firestore
 """
 
+import argparse
+import concurrent.futures
+import hashlib
+import heapq
 import sqlite3
 import json
 import asyncio
-from datetime import datetime
+import random
+import time
+import uuid
+from datetime import date, datetime, timezone
+from itertools import islice
+from typing import AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 import sys
 import os
 
+try:
+    import orjson
+    json_loads = orjson.loads  # Decoder JSON rápido, se instalado
+except ImportError:
+    orjson = None
+    json_loads = json.loads
+
 # Adicionar o diretório backend ao path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
-from app.core.firestore_adapter import firestore_adapter
+# Limite de operações por commit em lote do Firestore
+FIRESTORE_BATCH_LIMIT = 500
+
+# Tamanho máximo de um documento no Firestore (1 MiB)
+FIRESTORE_MAX_DOCUMENT_SIZE = 1024 * 1024
+
+# Campos JSON armazenados como texto no SQLite
+JSON_FIELDS = (
+    'preferences_json', 'address_json', 'settings_json',
+    'variables_json', 'criteria_json', 'accessibility_features',
+    'availability_json', 'exif_json', 'custom_data', 'tags',
+    'attachments', 'special_requirements', 'equipment_needed',
+    'metadata_json', 'before_json', 'after_json'
+)
+
+# Campos de data/hora convertidos para datetime
+TIMESTAMP_FIELDS = (
+    'created_at', 'updated_at', 'token_expires_at', 'read_at',
+    'approved_at', 'generated_at', 'sent_at', 'signed_at', 'expires_at',
+    'completed_at', 'start_datetime', 'end_datetime', 'movement_date'
+)
+
+# Campos removidos por tabela (password_hash será refeito com Firebase Auth)
+DROPPED_FIELDS = {
+    'users': ('password_hash',),
+}
+
+# Campos convertidos de string JSON para lista por tabela
+LIST_FIELDS = {
+    'locations': ('photos',),
+}
+
+RowTransformer = Callable[[dict], Tuple[dict, Optional[str]]]
+
+
+def compile_row_transformer(table_name: str, columns: Iterable[str]) -> RowTransformer:
+    """Compilar a conversão de registros de uma tabela para o formato do Firestore
+
+    As listas de campos são filtradas uma única vez pelas colunas que a tabela
+    realmente possui, então cada registro só percorre os campos relevantes.
+    """
+    column_set = set(columns)
+    json_columns = tuple(field for field in JSON_FIELDS if field in column_set)
+    timestamp_columns = tuple(field for field in TIMESTAMP_FIELDS if field in column_set)
+    dropped_columns = tuple(field for field in DROPPED_FIELDS.get(table_name, ()) if field in column_set)
+    list_columns = tuple(field for field in LIST_FIELDS.get(table_name, ()) if field in column_set)
+    has_id = 'id' in column_set
+
+    def transform(data: dict) -> Tuple[dict, Optional[str]]:
+        for field in json_columns:
+            value = data.get(field)
+            if value and isinstance(value, str):
+                try:
+                    data[field] = json_loads(value)
+                except ValueError:
+                    print(f"⚠️ Erro ao converter JSON do campo {field}: {value}")
+                    data[field] = {}
+
+        for field in timestamp_columns:
+            value = data.get(field)
+            if value and isinstance(value, str):
+                try:
+                    # Tentar parsing ISO format
+                    data[field] = datetime.fromisoformat(value.replace('Z', '+00:00'))
+                except ValueError:
+                    print(f"⚠️ Erro ao converter timestamp {field}: {value}")
+
+        for field in dropped_columns:
+            data.pop(field, None)
+
+        for field in list_columns:
+            value = data.get(field)
+            if isinstance(value, str):
+                try:
+                    data[field] = json_loads(value)
+                except ValueError:
+                    data[field] = []
+
+        # Usar ID existente como documento ID (removido dos dados)
+        doc_id = None
+        if has_id:
+            doc_id = str(data.pop('id'))
+
+        return data, doc_id
+
+    return transform
+
+
+def chunked(iterable: Iterable, size: int) -> Iterator[list]:
+    """Agrupar um iterável em listas de até `size` itens"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _canonical_default(value):
+    """Serializar tipos não-JSON de forma idêntica nos dois lados da verificação"""
+    if isinstance(value, datetime):
+        # Firestore devolve datetimes em UTC; datetimes sem fuso são tratados como UTC
+        value = value.astimezone(timezone.utc) if value.tzinfo else value.replace(tzinfo=timezone.utc)
+        return value.isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def canonical_json(value) -> bytes:
+    """JSON canônico: chaves ordenadas, sem espaços e datetimes sem fuso tratados como UTC"""
+    if orjson is not None:
+        return orjson.dumps(
+            value,
+            option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME,
+            default=_canonical_default
+        )
+    return json.dumps(
+        value, sort_keys=True, separators=(',', ':'),
+        ensure_ascii=False, default=_canonical_default
+    ).encode('utf-8')
+
+
+def document_digest(doc_id: str, data: dict) -> int:
+    """Hash de 128 bits de um documento canonicalizado"""
+    return int.from_bytes(hashlib.blake2b(canonical_json([doc_id, data]), digest_size=16).digest(), 'big')
+
+
+def chunk_of(doc_id: str, chunk_size: int) -> int:
+    """Bloco de verificação de um documento (faixa de ids); ids não numéricos ficam no bloco -1"""
+    try:
+        return int(doc_id) // chunk_size
+    except (TypeError, ValueError):
+        return -1
+
+
+def accumulate_digests(documents: Iterable[Tuple[str, dict]], chunk_size: int) -> Dict[int, Tuple[int, int]]:
+    """Resumir documentos em {bloco: (quantidade, XOR dos hashes)}
+
+    O XOR não depende da ordem de leitura, então SQLite (ordem numérica) e
+    Firestore (ordem lexicográfica dos ids) podem ser lidos cada um em fluxo.
+    """
+    digests = {}
+    for doc_id, data in documents:
+        chunk = chunk_of(doc_id, chunk_size)
+        count, digest = digests.get(chunk, (0, 0))
+        digests[chunk] = (count + 1, digest ^ document_digest(doc_id, data))
+    return digests
+
+
+# Transformadores compilados dentro de cada processo do pool (um por tabela/colunas)
+_worker_transformers = {}
+
+
+def transform_chunk(table_name: str, columns: Tuple[str, ...], rows: List[dict]) -> List[Tuple[Optional[str], dict]]:
+    """Converter um bloco de registros em (doc_id, dados); executado nos processos do pool"""
+    key = (table_name, columns)
+    transformer = _worker_transformers.get(key)
+    if transformer is None:
+        transformer = _worker_transformers[key] = compile_row_transformer(table_name, columns)
+
+    documents = []
+    for row in rows:
+        data, doc_id = transformer(row)
+        documents.append((doc_id, data))
+    return documents
+
+
+class MigrationCheckpoint:
+    """Checkpoint em arquivo JSON com o último id migrado (high-water mark) de cada tabela"""
+
+    def __init__(self, path: Optional[str] = 'migration_checkpoint.json', save_interval: float = 1.0):
+        self.path = path
+        self.tables = {}
+        # Intervalo mínimo entre gravações em disco durante o avanço do checkpoint
+        self.save_interval = save_interval
+        self._last_save = 0.0
+
+    def load(self) -> 'MigrationCheckpoint':
+        """Carregar checkpoint existente (se houver)"""
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.tables = json.load(f).get('tables', {})
+        return self
+
+    def save(self):
+        """Salvar checkpoint de forma atômica (arquivo temporário + rename)"""
+        if self.path is None:
+            # Checkpoint só em memória (ex.: dry-run)
+            return
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'tables': self.tables, 'saved_at': datetime.now().isoformat()}, f, indent=2)
+        os.replace(tmp_path, self.path)
+        self._last_save = time.monotonic()
+
+    def reset(self):
+        """Descartar progresso anterior"""
+        self.tables = {}
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def last_id(self, table_name: str) -> Optional[int]:
+        return self.tables.get(table_name, {}).get('last_id')
+
+    def is_completed(self, table_name: str) -> bool:
+        return self.tables.get(table_name, {}).get('completed', False)
+
+    def update(self, table_name: str, last_id: int):
+        entry = self.tables.setdefault(table_name, {'last_id': None, 'completed': False})
+        entry['last_id'] = last_id
+        if time.monotonic() - self._last_save >= self.save_interval:
+            self.save()
+
+    def mark_completed(self, table_name: str):
+        entry = self.tables.setdefault(table_name, {'last_id': None, 'completed': False})
+        entry['completed'] = True
+        self.save()
+
+
+class InMemoryFirestoreAdapter:
+    """Adaptador Firestore em memória para testar a migração localmente"""
+
+    def __init__(self, fail_first_commits: int = 0):
+        self.collections = {}
+        self.commits = 0
+        # Quantidade de commits que devem falhar antes de funcionar (simula erros transitórios)
+        self.fail_first_commits = fail_first_commits
+
+    async def create_document(self, collection: str, data: dict, doc_id: Optional[str] = None) -> str:
+        doc_id = doc_id or uuid.uuid4().hex
+        self.collections.setdefault(collection, {})[doc_id] = dict(data)
+        return doc_id
+
+    async def batch_write(self, collection: str, documents: List[Tuple[Optional[str], dict]]) -> None:
+        if self.fail_first_commits > 0:
+            self.fail_first_commits -= 1
+            raise ConnectionError("Falha transitória simulada")
+
+        docs = self.collections.setdefault(collection, {})
+        for doc_id, data in documents:
+            if data is None:
+                docs.pop(doc_id, None)
+            else:
+                docs[doc_id or uuid.uuid4().hex] = dict(data)
+        self.commits += 1
+
+    async def delete_document(self, collection: str, doc_id: str) -> bool:
+        return self.collections.get(collection, {}).pop(doc_id, None) is not None
+
+    async def get_document(self, collection: str, doc_id: str) -> Optional[dict]:
+        return self.collections.get(collection, {}).get(doc_id)
+
+    async def list_documents(self, collection: str, limit: Optional[int] = None) -> list:
+        docs = list(self.collections.get(collection, {}).values())
+        return docs[:limit] if limit else docs
+
+    async def count_documents(self, collection: str) -> int:
+        return len(self.collections.get(collection, {}))
+
+    def iter_documents(self, collection: str) -> Iterator[Tuple[str, dict]]:
+        yield from list(self.collections.get(collection, {}).items())
+
+
+def firestore_value_size(value) -> int:
+    """Tamanho de armazenamento de um valor segundo as regras de cálculo do Firestore"""
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode('utf-8')) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(len(str(key).encode('utf-8')) + 1 + firestore_value_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(firestore_value_size(item) for item in value)
+    return len(str(value).encode('utf-8')) + 1
+
+
+def firestore_document_size(collection: str, doc_id: Optional[str], data: dict) -> int:
+    """Tamanho estimado de um documento: nome do documento + campos + 32 bytes adicionais"""
+    # Ids automáticos do Firestore têm 20 caracteres
+    name_size = len(collection.encode('utf-8')) + 1 + len((doc_id or 'x' * 20).encode('utf-8')) + 1 + 16
+    return name_size + firestore_value_size(data) + 32
+
+
+class NullFirestoreSink:
+    """Destino descartável para dry-run: não grava nada, apenas mede os documentos"""
+
+    def __init__(self, top_n: int = 5, warn_ratio: float = 0.8):
+        self.top_n = top_n
+        # Documentos acima desta fração do limite de 1 MiB são sinalizados
+        self.warn_size = int(FIRESTORE_MAX_DOCUMENT_SIZE * warn_ratio)
+        self.collections = {}
+
+    def _stats(self, collection: str) -> dict:
+        return self.collections.setdefault(collection, {
+            'documents': 0, 'bytes': 0, 'largest': [], 'near_limit': []
+        })
+
+    async def batch_write(self, collection: str, documents: List[Tuple[Optional[str], Optional[dict]]]) -> None:
+        stats = self._stats(collection)
+        for doc_id, data in documents:
+            if data is None:
+                continue
+            size = firestore_document_size(collection, doc_id, data)
+            stats['documents'] += 1
+            stats['bytes'] += size
+            if len(stats['largest']) < self.top_n:
+                heapq.heappush(stats['largest'], (size, doc_id))
+            elif size > stats['largest'][0][0]:
+                heapq.heapreplace(stats['largest'], (size, doc_id))
+            if size >= self.warn_size:
+                stats['near_limit'].append((doc_id, size))
+
+    async def count_documents(self, collection: str) -> int:
+        return 0
+
+
+class BatchedFirestoreWriter:
+    """Escritor em lote: commits de até 500 documentos, concorrência limitada e retry com backoff
+
+    O limite `max_in_flight` vale para todas as chamadas de `write` simultâneas,
+    inclusive de tabelas diferentes migradas em paralelo.
+    """
+
+    def __init__(
+        self,
+        firestore,
+        batch_size: int = FIRESTORE_BATCH_LIMIT,
+        max_in_flight: int = 8,
+        max_retries: int = 5,
+        base_delay: float = 0.5
+    ):
+        self.firestore = firestore
+        self.batch_size = max(1, min(batch_size, FIRESTORE_BATCH_LIMIT))
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self._semaphore = None
+        self._semaphore_loop = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """Semáforo compartilhado por todas as escritas em andamento (orçamento global de commits)"""
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def _commit(self, collection: str, batch: List[Tuple[Optional[str], Optional[dict]]]) -> None:
+        """Enviar um lote usando a melhor API disponível no adaptador
+
+        Cada item é (doc_id, dados) e é gravado com set (upsert); dados None apaga o documento.
+        """
+        batch_write = getattr(self.firestore, 'batch_write', None)
+        if batch_write is not None:
+            await batch_write(collection, batch)
+            return
+
+        db = getattr(self.firestore, 'db', None)
+        if db is not None and hasattr(db, 'batch'):
+            def commit_native():
+                write_batch = db.batch()
+                collection_ref = db.collection(collection)
+                for doc_id, data in batch:
+                    doc_ref = collection_ref.document(doc_id) if doc_id else collection_ref.document()
+                    if data is None:
+                        write_batch.delete(doc_ref)
+                    else:
+                        write_batch.set(doc_ref, data)
+                write_batch.commit()
+
+            # run_in_executor em vez de asyncio.to_thread (Python 3.9+): setup.py declara 3.8+
+            await asyncio.get_running_loop().run_in_executor(None, commit_native)
+            return
+
+        await asyncio.gather(*(
+            self.firestore.delete_document(collection, doc_id) if data is None
+            else self.firestore.create_document(collection, data, doc_id)
+            for doc_id, data in batch
+        ))
+
+    async def _commit_with_retry(self, collection: str, batch: list, stats: dict) -> bool:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._commit(collection, batch)
+                stats['written'] += len(batch)
+                stats['commits'] += 1
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    stats['errors'] += len(batch)
+                    print(f"   ❌ Lote de {len(batch)} registros falhou após {attempt + 1} tentativas: {e}")
+                    return False
+                stats['retries'] += 1
+                delay = self.base_delay * (2 ** attempt)
+                await asyncio.sleep(delay + random.uniform(0, delay))
+
+    async def _batches(self, documents) -> AsyncIterator[list]:
+        """Agrupar documentos de um iterável síncrono ou assíncrono em lotes de `batch_size`"""
+        if not hasattr(documents, '__aiter__'):
+            for batch in chunked(documents, self.batch_size):
+                yield batch
+            return
+
+        batch = []
+        async for document in documents:
+            batch.append(document)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def write(
+        self,
+        collection: str,
+        documents: Union[Iterable[Tuple[Optional[str], dict]], AsyncIterator[Tuple[Optional[str], dict]]],
+        on_checkpoint: Optional[Callable[[str], None]] = None
+    ) -> dict:
+        """Escrever (doc_id, dados) em lotes, mantendo no máximo `max_in_flight` commits em andamento
+
+        `on_checkpoint` recebe o doc_id do último documento de um prefixo contínuo de
+        lotes confirmados: commits concluídos fora de ordem só avançam o checkpoint
+        quando todos os lotes anteriores também foram gravados.
+        """
+        stats = {'written': 0, 'errors': 0, 'commits': 0, 'retries': 0}
+        semaphore = self._get_semaphore()
+        pending = set()
+        finished = {}
+        progress = {'next_seq': 0, 'stalled': False}
+        start = time.perf_counter()
+
+        def advance_checkpoint():
+            last_doc_id = None
+            while not progress['stalled'] and progress['next_seq'] in finished:
+                committed, batch_last_id = finished.pop(progress['next_seq'])
+                if not committed:
+                    # Um lote falhou: o checkpoint não pode passar dele
+                    progress['stalled'] = True
+                    break
+                last_doc_id = batch_last_id
+                progress['next_seq'] += 1
+            if last_doc_id is not None and on_checkpoint is not None:
+                on_checkpoint(last_doc_id)
+
+        async def run(seq, batch):
+            try:
+                committed = await self._commit_with_retry(collection, batch, stats)
+                finished[seq] = (committed, batch[-1][0])
+                advance_checkpoint()
+            finally:
+                semaphore.release()
+
+        seq = 0
+        try:
+            async for batch in self._batches(documents):
+                # Adquirir antes de criar a tarefa limita memória e commits simultâneos
+                await semaphore.acquire()
+                task = asyncio.create_task(run(seq, batch))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                seq += 1
+        finally:
+            # Se a leitura falhar, os commits já enviados ainda terminam e avançam o checkpoint
+            if pending:
+                await asyncio.gather(*pending)
+
+        elapsed = time.perf_counter() - start
+        stats['elapsed'] = elapsed
+        stats['rows_per_sec'] = stats['written'] / elapsed if elapsed > 0 else 0.0
+        return stats
 
 
 class SQLiteToFirestoreMigration:
     """Classe para migrar dados do SQLite para Firestore"""
 
-    def __init__(self, sqlite_path: str = 'cinema_erp.db'):
+    def __init__(
+        self,
+        sqlite_path: str = 'cinema_erp.db',
+        firestore=None,
+        batch_mode: bool = False,
+        batch_size: int = FIRESTORE_BATCH_LIMIT,
+        max_in_flight: int = 8,
+        chunk_size: int = 1000,
+        page_size: int = 10000,
+        checkpoint: Optional[MigrationCheckpoint] = None,
+        workers: int = 0,
+        parallel_tables: int = 1
+    ):
         self.sqlite_path = sqlite_path
-        self.firestore = firestore_adapter
+        self.chunk_size = chunk_size
+        self.page_size = max(page_size, chunk_size)
+        self._conn = None
+        if firestore is None:
+            from app.core.firestore_adapter import firestore_adapter
+            firestore = firestore_adapter
+        self.firestore = firestore
+        self.batch_mode = batch_mode
+        self.writer = BatchedFirestoreWriter(
+            self.firestore,
+            batch_size=batch_size,
+            max_in_flight=max_in_flight
+        )
+        self.table_stats = {}
+        self.checkpoint = checkpoint or MigrationCheckpoint()
+        self._transformers = {}
+        # Processos para a etapa de conversão (0 = converter no próprio event loop)
+        self.workers = workers
+        self._pool = None
+        # Tabelas migradas ao mesmo tempo quando as dependências permitem (1 = sequencial)
+        self.parallel_tables = max(1, parallel_tables)
+
+        # Ordem de migração (respeitar dependências)
+        self.migration_order = [
+            'users',
+            'suppliers',
+            'tags',
+            'projects',
+            'locations',
+            'project_stages',
+            'project_tasks',
+            'contracts',
+            'location_photos',
+            'visits',
+            'notifications',
+            'presentations',
+            'financial_movements',
+            'audit_log',
+            'agenda_events'
+        ]
 
         # Mapeamento de tabelas SQLite para coleções Firestore
         self.table_mapping = {
@@ -42,90 +585,120 @@ class SQLiteToFirestoreMigration:
             'agenda_events': 'agenda_events'
         }
 
-    def get_sqlite_data(self, table_name: str) -> list:
-        """Obter dados de uma tabela SQLite"""
-        conn = sqlite3.connect(self.sqlite_path)
+    def open_connection(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        """Abrir uma nova conexão SQLite"""
+        conn = sqlite3.connect(self.sqlite_path, check_same_thread=check_same_thread)
         conn.row_factory = sqlite3.Row  # Para acessar colunas por nome
-        cursor = conn.cursor()
+        return conn
 
-        try:
-            cursor.execute(f"SELECT * FROM {table_name}")
-            rows = cursor.fetchall()
+    def get_connection(self) -> sqlite3.Connection:
+        """Obter a conexão SQLite compartilhada (aberta sob demanda)"""
+        if self._conn is None:
+            self._conn = self.open_connection()
+        return self._conn
 
-            # Converter para lista de dicionários
-            data = []
-            for row in rows:
-                row_dict = dict(row)
-                data.append(row_dict)
+    def close(self):
+        """Fechar a conexão SQLite compartilhada e o pool de processos"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
 
-            return data
+    def iter_sqlite_chunks(
+        self,
+        table_name: str,
+        after_id: Optional[int] = None,
+        conn: Optional[sqlite3.Connection] = None
+    ) -> Iterator[List[dict]]:
+        """Ler uma tabela SQLite em blocos, com paginação por chave (id > último id lido)"""
+        conn = conn or self.get_connection()
+        last_id = after_id
 
-        except sqlite3.Error as e:
-            print(f"❌ Erro ao ler tabela {table_name}: {e}")
-            return []
-        finally:
-            conn.close()
+        try:
+            while True:
+                if last_id is None:
+                    cursor = conn.execute(
+                        f"SELECT * FROM {table_name} ORDER BY id LIMIT ?",
+                        (self.page_size,)
+                    )
+                else:
+                    cursor = conn.execute(
+                        f"SELECT * FROM {table_name} WHERE id > ? ORDER BY id LIMIT ?",
+                        (last_id, self.page_size)
+                    )
 
-    def prepare_data_for_firestore(self, data: dict, table_name: str) -> dict:
-        """Preparar dados para Firestore"""
-        # Converter campos JSON se existirem
-        json_fields = [
-            'preferences_json', 'address_json', 'settings_json',
-            'variables_json', 'criteria_json', 'accessibility_features',
-            'availability_json', 'exif_json', 'custom_data', 'tags',
-            'attachments', 'special_requirements', 'equipment_needed',
-            'metadata_json', 'before_json', 'after_json'
-        ]
+                page_rows = 0
+                while True:
+                    rows = cursor.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    page_rows += len(rows)
+                    chunk = [dict(row) for row in rows]
+                    last_id = chunk[-1]['id']
+                    yield chunk
 
-        for field in json_fields:
-            if field in data and data[field]:
-                try:
-                    if isinstance(data[field], str):
-                        data[field] = json.loads(data[field])
-                except json.JSONDecodeError:
-                    print(f"⚠️ Erro ao converter JSON do campo {field}: {data[field]}")
-                    data[field] = {}
+                if page_rows < self.page_size:
+                    return
 
-        # Converter timestamps
-        timestamp_fields = [
-            'created_at', 'updated_at', 'token_expires_at', 'read_at',
-            'approved_at', 'generated_at', 'sent_at', 'signed_at', 'expires_at',
-            'completed_at', 'start_datetime', 'end_datetime', 'movement_date'
-        ]
+        except sqlite3.Error as e:
+            # Propagar: terminar o gerador aqui marcaria a tabela como concluída pela metade
+            print(f"❌ Erro ao ler tabela {table_name}: {e}")
+            raise
 
-        for field in timestamp_fields:
-            if field in data and data[field]:
-                try:
-                    if isinstance(data[field], str):
-                        # Tentar parsing ISO format
-                        data[field] = datetime.fromisoformat(data[field].replace('Z', '+00:00'))
-                except ValueError:
-                    print(f"⚠️ Erro ao converter timestamp {field}: {data[field]}")
+    def iter_sqlite_data(self, table_name: str, after_id: Optional[int] = None) -> Iterator[dict]:
+        """Iterar sobre os registros de uma tabela SQLite sem carregá-la inteira em memória"""
+        for chunk in self.iter_sqlite_chunks(table_name, after_id):
+            yield from chunk
 
-        # Converter campos específicos por tabela
-        if table_name == 'users':
-            # Remover password_hash por segurança (será refeito com Firebase Auth)
-            if 'password_hash' in data:
-                del data['password_hash']
+    def count_sqlite_rows(self, table_name: str, after_id: Optional[int] = None) -> int:
+        """Contar registros de uma tabela SQLite (opcionalmente apenas os de id > after_id)"""
+        try:
+            conn = self.get_connection()
+            if after_id is None:
+                return conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+            return conn.execute(
+                f"SELECT COUNT(*) FROM {table_name} WHERE id > ?", (after_id,)
+            ).fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"❌ Erro ao contar tabela {table_name}: {e}")
+            raise
 
-        elif table_name == 'locations':
-            # Converter photos de string para array se necessário
-            if 'photos' in data and isinstance(data['photos'], str):
-                try:
-                    data['photos'] = json.loads(data['photos'])
-                except:
-                    data['photos'] = []
+    def get_table_columns(self, table_name: str, conn: Optional[sqlite3.Connection] = None) -> List[str]:
+        """Colunas da tabela segundo PRAGMA table_info"""
+        conn = conn or self.get_connection()
+        return [row['name'] for row in conn.execute(f"PRAGMA table_info({table_name})").fetchall()]
 
-        # Usar ID existente como documento ID
-        doc_id = None
-        if 'id' in data:
-            doc_id = str(data['id'])
-            del data['id']  # Remover ID dos dados (será usado como doc ID)
+    def get_transformer(self, table_name: str, columns: Optional[List[str]] = None) -> RowTransformer:
+        """Obter o transformador compilado da tabela (colunas via PRAGMA table_info se não informadas)"""
+        transformer = self._transformers.get(table_name)
+        if transformer is None:
+            if columns is None:
+                columns = self.get_table_columns(table_name)
+            transformer = compile_row_transformer(table_name, columns)
+            self._transformers[table_name] = transformer
+        return transformer
 
-        return data, doc_id
+    def prepare_data_for_firestore(self, data: dict, table_name: str) -> Tuple[dict, Optional[str]]:
+        """Preparar dados para Firestore"""
+        transformer = self._transformers.get(table_name)
+        if transformer is None:
+            # Sem PRAGMA disponível (ex.: origem PostgreSQL), compilar a partir das colunas do registro
+            transformer = self.get_transformer(table_name, list(data))
+        return transformer(data)
 
     async def migrate_table(self, table_name: str) -> bool:
-        """Migrar uma tabela específica"""
+        """Migrar uma tabela específica; erro de leitura do SQLite deixa a tabela pendente no checkpoint"""
+        try:
+            return await self._migrate_table(table_name)
+        except sqlite3.Error as e:
+            print(f"   ❌ Leitura de {table_name} interrompida: {e}")
+            # Gravar o avanço já confirmado; --resume retoma a tabela a partir dele
+            self.checkpoint.save()
+            return False
+
+    async def _migrate_table(self, table_name: str) -> bool:
         print(f"\n📊 Migrando tabela: {table_name}")
 
         if table_name not in self.table_mapping:
@@ -134,14 +707,41 @@ class SQLiteToFirestoreMigration:
 
         collection_name = self.table_mapping[table_name]
 
-        # Obter dados do SQLite
-        sqlite_data = self.get_sqlite_data(table_name)
+        if self.checkpoint.is_completed(table_name):
+            print("   ⏭️ Tabela já migrada segundo o checkpoint")
+            return True
+
+        after_id = self.checkpoint.last_id(table_name)
+        if after_id is not None:
+            print(f"   ↩️ Retomando a partir do id {after_id}")
+
+        # Contar registros e ler o SQLite em fluxo
+        total = self.count_sqlite_rows(table_name, after_id)
 
-        if not sqlite_data:
+        if not total:
             print(f"   📭 Nenhum dado encontrado na tabela {table_name}")
+            self.checkpoint.mark_completed(table_name)
             return True
 
-        print(f"   📦 Encontrados {len(sqlite_data)} registros")
+        print(f"   📦 Encontrados {total} registros")
+
+        if self.workers or self.batch_mode:
+            if self.workers:
+                success = await self.migrate_table_pipeline(table_name, collection_name, after_id)
+            else:
+                self.get_transformer(table_name)
+                sqlite_data = self.iter_sqlite_data(table_name, after_id)
+                success = await self.migrate_table_batched(table_name, collection_name, sqlite_data)
+
+            if success:
+                self.checkpoint.mark_completed(table_name)
+            else:
+                # Gravar o último avanço pendente do checkpoint
+                self.checkpoint.save()
+            return success
+
+        self.get_transformer(table_name)
+        sqlite_data = self.iter_sqlite_data(table_name, after_id)
 
         # Migrar cada registro
         migrated_count = 0
@@ -162,41 +762,111 @@ class SQLiteToFirestoreMigration:
                 migrated_count += 1
                 print(f"   ✅ Migrado: {doc_id or created_id}")
 
+                # Só avançar o checkpoint enquanto não houver falhas nesta execução
+                if errors == 0 and doc_id is not None:
+                    self.checkpoint.update(table_name, int(doc_id))
+
             except Exception as e:
                 errors += 1
                 print(f"   ❌ Erro ao migrar registro: {e}")
 
         print(f"   📊 Resultado: {migrated_count} sucessos, {errors} erros")
+        if errors == 0:
+            self.checkpoint.mark_completed(table_name)
+        else:
+            self.checkpoint.save()
         return errors == 0
 
+    async def migrate_table_batched(self, table_name: str, collection_name: str, rows: Iterable[dict]) -> bool:
+        """Migrar uma tabela em lotes concorrentes"""
+        documents = (
+            (doc_id, firestore_data)
+            for firestore_data, doc_id in (
+                self.prepare_data_for_firestore(row, table_name) for row in rows
+            )
+        )
+        return await self.write_documents(table_name, collection_name, documents)
+
+    async def migrate_table_pipeline(self, table_name: str, collection_name: str, after_id: Optional[int]) -> bool:
+        """Migrar uma tabela em três etapas: leitura SQLite → conversão em processos → escrita em lote
+
+        As etapas são ligadas por uma fila limitada de blocos em conversão, então a
+        leitura para quando a conversão ou a escrita não acompanham (backpressure).
+        A ordem dos blocos é preservada para que o checkpoint continue correto.
+        """
+        loop = asyncio.get_running_loop()
+        if self._pool is None:
+            self._pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.workers)
+
+        columns = tuple(self.get_table_columns(table_name))
+        in_progress = asyncio.Queue(maxsize=self.workers * 2)
+
+        # Conexão própria: a leitura roda em uma thread auxiliar, possivelmente em
+        # paralelo com pipelines de outras tabelas
+        read_conn = self.open_connection(check_same_thread=False)
+
+        async def read_stage():
+            chunks = self.iter_sqlite_chunks(table_name, after_id, conn=read_conn)
+            try:
+                while True:
+                    chunk = await loop.run_in_executor(None, next, chunks, None)
+                    if chunk is None:
+                        break
+                    future = loop.run_in_executor(self._pool, transform_chunk, table_name, columns, chunk)
+                    await in_progress.put(future)
+            except Exception:
+                await in_progress.put(None)
+                raise
+            await in_progress.put(None)
+
+        async def transformed_documents():
+            while True:
+                future = await in_progress.get()
+                if future is None:
+                    return
+                for document in await future:
+                    yield document
+
+        reader = asyncio.create_task(read_stage())
+        try:
+            success = await self.write_documents(table_name, collection_name, transformed_documents())
+        finally:
+            if not reader.done():
+                reader.cancel()
+            await asyncio.gather(reader, return_exceptions=True)
+            read_conn.close()
+        if not reader.cancelled() and reader.exception() is not None:
+            raise reader.exception()
+        return success
+
+    async def write_documents(self, table_name: str, collection_name: str, documents) -> bool:
+        """Enviar documentos já convertidos pelo escritor em lote e registrar as estatísticas"""
+        stats = await self.writer.write(
+            collection_name,
+            documents,
+            on_checkpoint=lambda doc_id: self.checkpoint.update(table_name, int(doc_id))
+        )
+        self.table_stats[table_name] = stats
+
+        print(
+            f"   📊 Resultado {table_name}: {stats['written']} sucessos, {stats['errors']} erros, "
+            f"{stats['commits']} commits, {stats['retries']} retries "
+            f"({stats['rows_per_sec']:.0f} registros/s em {stats['elapsed']:.2f}s)"
+        )
+        return stats['errors'] == 0
+
     async def migrate_all(self) -> dict:
         """Migrar todas as tabelas"""
         print("🚀 Iniciando migração completa SQLite → Firestore")
         print("=" * 60)
 
         results = {}
+        tables = [t for t in self.migration_order if t in self.table_mapping]
 
-        # Ordem de migração (respeitar dependências)
-        migration_order = [
-            'users',
-            'suppliers',
-            'tags',
-            'projects',
-            'locations',
-            'project_stages',
-            'project_tasks',
-            'contracts',
-            'location_photos',
-            'visits',
-            'notifications',
-            'presentations',
-            'financial_movements',
-            'audit_log',
-            'agenda_events'
-        ]
-
-        for table_name in migration_order:
-            if table_name in self.table_mapping:
+        if self.parallel_tables > 1:
+            results = await self.migrate_tables_concurrently(tables)
+        else:
+            for table_name in tables:
                 success = await self.migrate_table(table_name)
                 results[table_name] = success
 
@@ -219,28 +889,199 @@ class SQLiteToFirestoreMigration:
 
         return results
 
-    async def verify_migration(self) -> dict:
-        """Verificar se a migração foi bem-sucedida"""
-        print("\n🔍 Verificando migração...")
+    def build_dependency_graph(self, tables: List[str]) -> Dict[str, Set[str]]:
+        """Dependências de cada tabela (tabelas referenciadas via PRAGMA foreign_key_list)"""
+        dependencies = {table_name: set() for table_name in tables}
+        conn = self.get_connection()
+
+        for table_name in tables:
+            try:
+                foreign_keys = conn.execute(f"PRAGMA foreign_key_list({table_name})").fetchall()
+            except sqlite3.Error as e:
+                print(f"⚠️ Erro ao ler chaves estrangeiras de {table_name}: {e}")
+                continue
+
+            for foreign_key in foreign_keys:
+                parent = foreign_key['table']
+                if parent in dependencies and parent != table_name:
+                    dependencies[table_name].add(parent)
+
+        return dependencies
+
+    async def migrate_tables_concurrently(self, tables: List[str]) -> dict:
+        """Migrar tabelas em paralelo respeitando o DAG de chaves estrangeiras
+
+        Uma tabela começa assim que todas as tabelas que ela referencia terminam,
+        com no máximo `parallel_tables` ao mesmo tempo. Os commits de todas as
+        tabelas dividem o mesmo limite do escritor em lote.
+        """
+        remaining = self.build_dependency_graph(tables)
+        running = {}
+        results = {}
+
+        while remaining or running:
+            ready = [
+                t for t in tables
+                if t in remaining and not remaining[t]
+            ][:self.parallel_tables - len(running)]
+
+            if not ready and not running:
+                # Ciclo de dependências: seguir a ordem fixa para desbloquear
+                table_name = next(t for t in tables if t in remaining)
+                print(f"⚠️ Dependência circular envolvendo {table_name}, seguindo a ordem padrão")
+                ready = [table_name]
+
+            for table_name in ready:
+                del remaining[table_name]
+                running[asyncio.create_task(self.migrate_table(table_name))] = table_name
+
+            done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                table_name = running.pop(task)
+                try:
+                    results[table_name] = task.result()
+                except Exception as e:
+                    print(f"   ❌ Erro ao migrar tabela {table_name}: {e}")
+                    results[table_name] = False
+
+                for dependencies in remaining.values():
+                    dependencies.discard(table_name)
+
+        # Manter o resumo na ordem padrão
+        return {t: results[t] for t in tables if t in results}
+
+    def sqlite_chunk_digests(self, table_name: str, chunk_size: int) -> Dict[int, Tuple[int, int]]:
+        """Hashes por bloco dos registros SQLite, convertidos como na migração"""
+        conn = self.open_connection()
+        try:
+            transformer = compile_row_transformer(table_name, self.get_table_columns(table_name, conn))
+            documents = (
+                (doc_id, data)
+                for chunk in self.iter_sqlite_chunks(table_name, conn=conn)
+                for data, doc_id in map(transformer, chunk)
+            )
+            return accumulate_digests(documents, chunk_size)
+        finally:
+            conn.close()
+
+    def iter_firestore_documents(self, collection_name: str) -> Iterator[Tuple[str, dict]]:
+        """Ler uma coleção do Firestore em fluxo como (doc_id, dados)"""
+        iter_documents = getattr(self.firestore, 'iter_documents', None)
+        if iter_documents is not None:
+            return iter_documents(collection_name)
+
+        db = getattr(self.firestore, 'db', None)
+        if db is None:
+            raise RuntimeError("Adaptador Firestore não permite leitura em fluxo (iter_documents/db)")
+        return ((snapshot.id, snapshot.to_dict()) for snapshot in db.collection(collection_name).stream())
+
+    async def get_firestore_documents(self, collection_name: str, doc_ids: List[str]) -> Dict[str, dict]:
+        """Buscar um conjunto de documentos pelo id (usado apenas nos blocos divergentes)"""
+        db = getattr(self.firestore, 'db', None)
+        if db is not None and hasattr(db, 'get_all'):
+            def fetch():
+                refs = [db.collection(collection_name).document(doc_id) for doc_id in doc_ids]
+                return {snapshot.id: snapshot.to_dict() for snapshot in db.get_all(refs) if snapshot.exists}
+            return await asyncio.get_running_loop().run_in_executor(None, fetch)
+
+        # Uma leitura por id: limitar as requisições simultâneas ao mesmo orçamento das escritas
+        semaphore = self.writer._get_semaphore()
+
+        async def get_document(doc_id):
+            async with semaphore:
+                return await self.firestore.get_document(collection_name, doc_id)
+
+        found = await asyncio.gather(*(get_document(doc_id) for doc_id in doc_ids))
+        return {doc_id: data for doc_id, data in zip(doc_ids, found) if data is not None}
+
+    async def drill_down_chunk(self, table_name: str, collection_name: str, chunk: int, chunk_size: int) -> dict:
+        """Comparar documento a documento um bloco cujo hash divergiu"""
+        low, high = chunk * chunk_size, (chunk + 1) * chunk_size
+        transformer = compile_row_transformer(table_name, self.get_table_columns(table_name))
+        rows = self.get_connection().execute(
+            f"SELECT * FROM {table_name} WHERE id >= ? AND id < ?", (low, high)
+        ).fetchall()
+        expected = dict((doc_id, data) for data, doc_id in (transformer(dict(row)) for row in rows))
+
+        # Todos os ids da faixa, para detectar também documentos que só existem no Firestore
+        actual = await self.get_firestore_documents(collection_name, [str(i) for i in range(low, high)])
+
+        return {
+            'missing': sorted(set(expected) - set(actual), key=int),
+            'extra': sorted(set(actual) - set(expected), key=int),
+            'different': sorted(
+                (doc_id for doc_id in set(expected) & set(actual)
+                 if document_digest(doc_id, expected[doc_id]) != document_digest(doc_id, actual[doc_id])),
+                key=int
+            )
+        }
+
+    async def verify_table(self, table_name: str, collection_name: str, chunk_size: int = 1000) -> dict:
+        """Verificar conteúdo de uma tabela comparando hashes por bloco de ids"""
+        loop = asyncio.get_running_loop()
+        sqlite_digests, firestore_digests = await asyncio.gather(
+            loop.run_in_executor(None, self.sqlite_chunk_digests, table_name, chunk_size),
+            loop.run_in_executor(
+                None, lambda: accumulate_digests(self.iter_firestore_documents(collection_name), chunk_size)
+            )
+        )
+
+        mismatched = sorted(
+            chunk for chunk in set(sqlite_digests) | set(firestore_digests)
+            if sqlite_digests.get(chunk) != firestore_digests.get(chunk)
+        )
+
+        result = {
+            'sqlite_count': sum(count for count, _ in sqlite_digests.values()),
+            'firestore_count': sum(count for count, _ in firestore_digests.values()),
+            'chunks': len(set(sqlite_digests) | set(firestore_digests)),
+            'mismatched_chunks': len(mismatched),
+            'differences': {}
+        }
+
+        for chunk in mismatched:
+            if chunk < 0:
+                result['differences']['non_numeric_ids'] = {
+                    'firestore_count': firestore_digests.get(chunk, (0, 0))[0]
+                }
+                continue
+            result['differences'][str(chunk)] = await self.drill_down_chunk(
+                table_name, collection_name, chunk, chunk_size
+            )
+
+        result['match'] = not mismatched
+        return result
+
+    async def verify_migration(self, chunk_size: int = 1000) -> dict:
+        """Verificar se a migração foi bem-sucedida comparando o conteúdo, bloco a bloco"""
+        print("\n🔍 Verificando migração (hashes por bloco)...")
 
         verification = {}
 
         for table_name, collection_name in self.table_mapping.items():
             try:
-                # Contar registros no SQLite
-                sqlite_count = len(self.get_sqlite_data(table_name))
+                if not self.count_sqlite_rows(table_name) and not await self.firestore.count_documents(collection_name):
+                    verification[table_name] = {'sqlite_count': 0, 'firestore_count': 0, 'match': True}
+                    continue
 
-                # Contar documentos no Firestore
-                firestore_count = await self.firestore.count_documents(collection_name)
-
-                verification[table_name] = {
-                    'sqlite_count': sqlite_count,
-                    'firestore_count': firestore_count,
-                    'match': sqlite_count == firestore_count
-                }
+                result = await self.verify_table(table_name, collection_name, chunk_size)
+                verification[table_name] = result
 
-                status = "✅" if sqlite_count == firestore_count else "❌"
-                print(f"   {status} {table_name}: SQLite={sqlite_count}, Firestore={firestore_count}")
+                status = "✅" if result['match'] else "❌"
+                print(
+                    f"   {status} {table_name}: SQLite={result['sqlite_count']}, "
+                    f"Firestore={result['firestore_count']}, "
+                    f"blocos divergentes={result['mismatched_chunks']}/{result['chunks']}"
+                )
+                for chunk, diff in result['differences'].items():
+                    if chunk == 'non_numeric_ids':
+                        print(f"      ⚠️ {diff['firestore_count']} documentos com id não numérico no Firestore")
+                        continue
+                    print(
+                        f"      🔎 Bloco {chunk}: {len(diff['missing'])} faltando, "
+                        f"{len(diff['extra'])} sobrando, {len(diff['different'])} diferentes"
+                    )
 
             except Exception as e:
                 print(f"   ❌ Erro ao verificar {table_name}: {e}")
@@ -249,23 +1090,161 @@ class SQLiteToFirestoreMigration:
         return verification
 
 
-async def main():
-    """Função principal"""
-    migration = SQLiteToFirestoreMigration()
+def parse_args(argv=None):
+    """Ler argumentos da linha de comando"""
+    parser = argparse.ArgumentParser(description="Migração de dados SQLite → Firestore")
+    parser.add_argument('--sqlite-path', default='cinema_erp.db', help="Caminho do banco SQLite")
+    parser.add_argument('--batch', action='store_true', help="Usar escrita em lotes concorrentes")
+    parser.add_argument('--batch-size', type=int, default=FIRESTORE_BATCH_LIMIT,
+                        help="Documentos por commit (máx. 500)")
+    parser.add_argument('--max-in-flight', type=int, default=8,
+                        help="Commits simultâneos em andamento")
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help="Registros por fetchmany na leitura do SQLite")
+    parser.add_argument('--workers', type=int, default=0,
+                        help="Processos para converter os registros (0 = sem pool)")
+    parser.add_argument('--parallel-tables', type=int, default=1,
+                        help="Tabelas migradas em paralelo quando o grafo de dependências permite")
+    parser.add_argument('--dry-run', action='store_true',
+                        help="Executar leitura + conversão completas com destino nulo e estimar o tempo")
+    parser.add_argument('--assumed-commit-latency', type=float, default=0.25,
+                        help="Latência estimada (s) de um commit de 500 documentos no Firestore real")
+    parser.add_argument('--verify-only', action='store_true',
+                        help="Apenas verificar (hashes por bloco), sem migrar")
+    parser.add_argument('--skip-verify', action='store_true',
+                        help="Não verificar após migrar (a verificação roda à parte com --verify-only)")
+    parser.add_argument('--verify-chunk-size', type=int, default=1000,
+                        help="Ids por bloco na verificação por hash")
+    parser.add_argument('--resume', action='store_true',
+                        help="Continuar a partir do checkpoint da execução anterior")
+    parser.add_argument('--checkpoint-file', default='migration_checkpoint.json',
+                        help="Arquivo de checkpoint com o último id migrado por tabela")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="Escrever em um Firestore em memória (teste local)")
+    return parser.parse_args(argv)
+
+
+async def run_dry_run(migration: SQLiteToFirestoreMigration, commit_latency: float) -> dict:
+    """Medir o pipeline de leitura + conversão contra um destino nulo e projetar o tempo real"""
+    sink = migration.firestore
+    writer = migration.writer
+    # Vazão máxima de escrita: commits simultâneos × documentos por commit / latência do commit
+    write_rps = writer.max_in_flight * writer.batch_size / commit_latency
+
+    print("🧪 Dry-run: leitura + conversão completas, sem gravar no Firestore")
+    print(f"   Escrita estimada: {write_rps:.0f} docs/s "
+          f"({writer.max_in_flight} commits × {writer.batch_size} docs / {commit_latency}s)")
+
+    await migration.migrate_all()
+
+    print("\n" + "=" * 60)
+    print("📈 Estimativa por tabela:")
+
+    tables = {}
+    total_projected = 0.0
+
+    for table_name, stats in migration.table_stats.items():
+        collection = migration.table_mapping[table_name]
+        sizes = sink.collections.get(collection)
+        if not sizes or not sizes['documents']:
+            continue
+
+        elapsed = stats['elapsed'] or 1e-9
+        pipeline_rps = sizes['documents'] / elapsed
+        projected = sizes['documents'] / min(pipeline_rps, write_rps)
+        total_projected += projected
+
+        tables[table_name] = {
+            'rows': sizes['documents'],
+            'rows_per_sec': pipeline_rps,
+            'bytes_per_sec': sizes['bytes'] / elapsed,
+            'avg_document_bytes': sizes['bytes'] / sizes['documents'],
+            'largest_documents': [
+                {'id': doc_id, 'bytes': size} for size, doc_id in sorted(sizes['largest'], reverse=True)
+            ],
+            'near_limit': [{'id': doc_id, 'bytes': size} for doc_id, size in sizes['near_limit']],
+            'bottleneck': 'leitura/conversão' if pipeline_rps < write_rps else 'escrita',
+            'projected_seconds': projected
+        }
+
+        info = tables[table_name]
+        print(f"\n   🗂️  {table_name}: {info['rows']} registros")
+        print(f"      {info['rows_per_sec']:.0f} registros/s, {info['bytes_per_sec'] / 1024 / 1024:.2f} MiB/s, "
+              f"média {info['avg_document_bytes']:.0f} bytes/doc")
+        print(f"      Maior documento: {info['largest_documents'][0]['bytes']} bytes "
+              f"(id {info['largest_documents'][0]['id']})")
+        print(f"      ⏱️ Tempo projetado: {projected:.1f}s (gargalo: {info['bottleneck']})")
+        for document in info['near_limit']:
+            print(f"      ⚠️ Documento {document['id']} com {document['bytes']} bytes, perto do limite de 1 MiB")
+
+    print(f"\n🎯 Tempo total projetado (tabelas em sequência): {total_projected:.1f}s")
+
+    return {
+        'write_rows_per_sec': write_rps,
+        'assumed_commit_latency': commit_latency,
+        'tables': tables,
+        'projected_total_seconds': total_projected
+    }
+
+
+async def main(argv=None) -> int:
+    """Função principal; devolve o código de saída (0 = tudo migrado e verificado)"""
+    args = parse_args(argv)
+
+    if args.dry_run:
+        migration = SQLiteToFirestoreMigration(
+            sqlite_path=args.sqlite_path,
+            firestore=NullFirestoreSink(),
+            batch_mode=True,
+            batch_size=args.batch_size,
+            max_in_flight=args.max_in_flight,
+            chunk_size=args.chunk_size,
+            checkpoint=MigrationCheckpoint(path=None),
+            workers=args.workers,
+            parallel_tables=args.parallel_tables
+        )
+        try:
+            report = await run_dry_run(migration, args.assumed_commit_latency)
+            report['timestamp'] = datetime.now().isoformat()
+            with open('dry_run_report.json', 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+            print("📄 Relatório salvo em: dry_run_report.json")
+        finally:
+            migration.close()
+        return 0
+
+    checkpoint = MigrationCheckpoint(args.checkpoint_file)
+    if args.resume or args.verify_only:
+        checkpoint.load()
+    else:
+        checkpoint.reset()
+
+    migration = SQLiteToFirestoreMigration(
+        sqlite_path=args.sqlite_path,
+        firestore=InMemoryFirestoreAdapter() if args.in_memory else None,
+        batch_mode=args.batch,
+        batch_size=args.batch_size,
+        max_in_flight=args.max_in_flight,
+        chunk_size=args.chunk_size,
+        checkpoint=checkpoint,
+        workers=args.workers,
+        parallel_tables=args.parallel_tables
+    )
 
     print("🔥 Migração de Dados: SQLite → Firebase Firestore")
     print("=" * 60)
 
     try:
         # Executar migração
-        results = await migration.migrate_all()
+        results = {} if args.verify_only else await migration.migrate_all()
 
         # Verificar migração
-        verification = await migration.verify_migration()
+        verification = {} if args.skip_verify else await migration.verify_migration(args.verify_chunk_size)
 
         # Salvar relatório
         report = {
             'migration_results': results,
+            'table_stats': migration.table_stats,
             'verification': verification,
             'timestamp': datetime.now().isoformat()
         }
@@ -277,7 +1256,19 @@ async def main():
 
     except Exception as e:
         print(f"❌ Erro durante migração: {e}")
+        return 1
+    finally:
+        migration.close()
+
+    # Código de saída != 0 faz o migrate_to_firebase_complete.py tentar de novo com --resume
+    failed = [table for table, success in results.items() if not success]
+    mismatched = [table for table, result in verification.items() if not result.get('match')]
+    if failed:
+        print(f"❌ Tabelas não concluídas: {', '.join(failed)}")
+    if mismatched:
+        print(f"❌ Verificação divergente: {', '.join(mismatched)}")
+    return 1 if failed or mismatched else 0
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Perfil de inicialização (cold start) do backend
+
+Executa `python -X importtime -c "import <módulo>"` em processos novos,
+resume os módulos mais caros (tempo próprio e cumulativo) e compara o tempo
+total com o orçamento de cold start de um worker. Pensado para o serviço
+cinema-backend do Cloud Run (scale-from-zero), para onde o firebase.json
+redireciona /api/**.
+
+Uso:
+    python profile_startup.py                       # app.main
+    python profile_startup.py --module app.core.database --budget-ms 300
+    python profile_startup.py --runs 5 --top 30 --output startup_profile.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend')
+
+# Orçamento de cold start de um worker (import da aplicação, sem tráfego)
+DEFAULT_BUDGET_MS = 1500
+
+
+def run_importtime(module: str) -> tuple:
+    """Executa o import em um processo novo; retorna (linhas do -X importtime, tempo total em ms)"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [BACKEND_DIR, env.get('PYTHONPATH')]))
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, env=env, cwd=BACKEND_DIR if os.path.isdir(BACKEND_DIR) else None
+    )
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "falha no import")
+    return result.stderr.splitlines(), elapsed_ms
+
+
+def parse_importtime(lines: list) -> list:
+    """Converte a saída do -X importtime em registros (módulo, próprio_ms, cumulativo_ms)"""
+    entries = []
+    for line in lines:
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        entries.append({
+            'module': name.strip(),
+            'depth': (len(name) - len(name.lstrip())) // 2,
+            'self_ms': int(self_us) / 1000,
+            'cumulative_ms': int(cumulative_us) / 1000,
+        })
+    return entries
+
+
+def top_level_packages(entries: list) -> dict:
+    """Tempo próprio somado por pacote de primeiro nível (fastapi, sqlalchemy, pydantic...)"""
+    packages = {}
+    for entry in entries:
+        package = entry['module'].split('.')[0]
+        packages[package] = packages.get(package, 0.0) + entry['self_ms']
+    return dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfil de tempo de import do backend")
+    parser.add_argument('--module', default='app.main', help="Módulo a importar")
+    parser.add_argument('--runs', type=int, default=3, help="Processos novos a medir")
+    parser.add_argument('--top', type=int, default=20, help="Quantidade de módulos no ranking")
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS, help="Orçamento de cold start")
+    parser.add_argument('--output', help="Salvar relatório JSON")
+    args = parser.parse_args()
+
+    print(f"🚀 Perfil de inicialização: import {args.module}")
+    print("=" * 60)
+
+    wall_times, runs = [], []
+    for _ in range(args.runs):
+        lines, elapsed_ms = run_importtime(args.module)
+        wall_times.append(elapsed_ms)
+        runs.append(parse_importtime(lines))
+
+    # Usar a execução mediana para o ranking (a primeira costuma pagar cache de disco)
+    median_index = sorted(range(len(wall_times)), key=lambda i: wall_times[i])[len(wall_times) // 2]
+    entries = runs[median_index]
+    import_ms = sum(entry['self_ms'] for entry in entries)
+    wall_ms = statistics.median(wall_times)
+
+    print("\n📦 Tempo por pacote de primeiro nível:")
+    for package, package_ms in list(top_level_packages(entries).items())[:10]:
+        print(f"   {package_ms:8.1f} ms  {package}")
+
+    print(f"\n🐢 Top {args.top} módulos por tempo próprio:")
+    for entry in sorted(entries, key=lambda e: e['self_ms'], reverse=True)[:args.top]:
+        print(f"   {entry['self_ms']:8.1f} ms  {entry['module']}")
+
+    within_budget = wall_ms <= args.budget_ms
+    print(f"\n⏱️ Imports: {import_ms:.0f} ms | Processo completo (mediana de {args.runs}): {wall_ms:.0f} ms")
+    print(f"{'✅' if within_budget else '❌'} Orçamento de cold start: {args.budget_ms:.0f} ms")
+
+    if args.output:
+        report = {
+            'module': args.module,
+            'runs_ms': wall_times,
+            'median_ms': wall_ms,
+            'import_ms': import_ms,
+            'budget_ms': args.budget_ms,
+            'within_budget': within_budget,
+            'packages_ms': top_level_packages(entries),
+            'modules': sorted(entries, key=lambda e: e['self_ms'], reverse=True)[:args.top],
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"📄 Relatório salvo em: {args.output}")
+
+    sys.exit(0 if within_budget else 1)
+
+
+if __name__ == "__main__":
+    main()
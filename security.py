@@ -1,11 +1,87 @@
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Union, Optional
+from functools import lru_cache
+from typing import Any, Union, Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from .config import settings
 
-# Contexto para hash de senhas
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+try:
+    # PyJWT verifica HS256 bem mais rápido que python-jose quando instalado
+    import jwt as pyjwt
+    if not hasattr(pyjwt, "PyJWT"):
+        pyjwt = None
+except ImportError:
+    pyjwt = None
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache()
+def get_pwd_context() -> CryptContext:
+    """
+    Contexto para hash de senhas, criado no primeiro uso (hashes com outro custo são refeitos no login)
+    """
+    return CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+TOKEN_DECODE_ERRORS = (JWTError, pyjwt.PyJWTError) if pyjwt else (JWTError,)
+
+
+class TokenCache:
+    """
+    LRU de tokens já verificados, indexado pelo hash do token e respeitando o exp
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[str]:
+        key = self._key(token)
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            subject, expires_at = item
+            if expires_at <= time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return subject
+
+    def set(self, token: str, subject: str, expires_at: float):
+        if self.max_size <= 0:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._data[key] = (subject, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+@lru_cache()
+def get_token_cache() -> TokenCache:
+    return TokenCache(settings.TOKEN_CACHE_SIZE)
 
 
 def create_access_token(
@@ -20,35 +96,325 @@ def create_access_token(
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    
+
     to_encode = {"exp": expire, "sub": str(subject)}
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
 
+class SQLiteRevocationStore:
+    """
+    Revogações de refresh tokens em SQLite (uma instância do backend)
+
+    Guarda apenas chaves revogadas (jti ou família) até o exp do token, então
+    o tamanho acompanha as revogações ativas e não o número de sessões.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS revoked_tokens (key TEXT PRIMARY KEY, expires_at REAL NOT NULL) WITHOUT ROWID"
+        )
+        self._revocations = 0
+
+    def revoke(self, key: str, expires_at: float) -> bool:
+        """Revoga a chave; False se já estava revogada"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO revoked_tokens (key, expires_at) VALUES (?, ?)", (key, expires_at)
+            )
+            self._revocations += 1
+            if self._revocations % 1000 == 0:
+                self._conn.execute("DELETE FROM revoked_tokens WHERE expires_at <= ?", (time.time(),))
+            return cursor.rowcount == 1
+
+    def is_revoked(self, *keys: str) -> bool:
+        placeholders = ", ".join("?" * len(keys))
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT 1 FROM revoked_tokens WHERE key IN ({placeholders}) AND expires_at > ? LIMIT 1",
+                (*keys, time.time()),
+            ).fetchone()
+        return row is not None
+
+
+class RedisRevocationStore:
+    """
+    Revogações de refresh tokens no Redis (compartilhadas entre instâncias)
+    """
+
+    def __init__(self, url: str, prefix: str = "cinema:revoked"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def revoke(self, key: str, expires_at: float) -> bool:
+        ttl = max(1, int(expires_at - time.time()) + 1)
+        return bool(self.client.set(f"{self.prefix}:{key}", 1, nx=True, ex=ttl))
+
+    def is_revoked(self, *keys: str) -> bool:
+        return self.client.exists(*(f"{self.prefix}:{key}" for key in keys)) > 0
+
+
+_revocation_store = None
+
+DEFAULT_REVOCATION_STORE = "sqlite:///refresh_tokens.db"
+
+
+def revocation_store_url() -> str:
+    """
+    REFRESH_TOKEN_STORE; sem ele, o Redis de REDIS_URL quando a variável foi
+    definida no ambiente (o valor padrão de REDIS_URL não conta) e, por último,
+    o SQLite local
+    """
+    if settings.REFRESH_TOKEN_STORE:
+        return settings.REFRESH_TOKEN_STORE
+    if "REDIS_URL" in settings.model_fields_set:
+        return settings.REDIS_URL
+    return DEFAULT_REVOCATION_STORE
+
+
+def get_revocation_store():
+    """
+    Store de revogação (ver revocation_store_url), criado no primeiro uso
+    """
+    global _revocation_store
+    if _revocation_store is None:
+        url = revocation_store_url()
+        if url.startswith("redis"):
+            _revocation_store = RedisRevocationStore(url)
+        else:
+            if settings.WEB_CONCURRENCY > 1:
+                # Processos do mesmo host compartilham o arquivo; outras instâncias/containers não
+                logger.warning(
+                    "Revogação de refresh tokens em SQLite (%s) com WEB_CONCURRENCY=%d: tokens revogados "
+                    "só valem para os processos deste host. Defina REFRESH_TOKEN_STORE=redis://... "
+                    "se houver mais de uma instância.",
+                    url, settings.WEB_CONCURRENCY,
+                )
+            _revocation_store = SQLiteRevocationStore(url.replace("sqlite:///", "", 1))
+    return _revocation_store
+
+
+def create_refresh_token(subject: Union[str, Any], family: Optional[str] = None) -> str:
+    """
+    Cria um refresh token JWT; tokens rotacionados mantêm a mesma família
+    """
+    expire = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "type": "refresh",
+        "jti": uuid.uuid4().hex,
+        "fam": family or uuid.uuid4().hex,
+    }
+    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+def _decode_refresh_token(token: str) -> Optional[dict]:
+    try:
+        payload = decode_token(token)
+    except TOKEN_DECODE_ERRORS:
+        return None
+    if payload.get("type") != "refresh" or not payload.get("jti") or not payload.get("sub"):
+        return None
+    return payload
+
+
+def rotate_refresh_token(refresh_token: str) -> Optional[Tuple[str, str]]:
+    """
+    Troca um refresh token válido por um novo par (access_token, refresh_token)
+
+    Cada refresh token é de uso único. Reapresentar um token já rotacionado
+    indica vazamento, e a família inteira (a sessão) é revogada.
+    """
+    payload = _decode_refresh_token(refresh_token)
+    if payload is None:
+        return None
+
+    store = get_revocation_store()
+    family_key = f"fam:{payload['fam']}"
+    if store.is_revoked(family_key):
+        return None
+    if not store.revoke(f"jti:{payload['jti']}", float(payload["exp"])):
+        # Token reutilizado: encerrar a sessão até o fim da validade máxima
+        store.revoke(family_key, time.time() + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+        return None
+
+    subject = payload["sub"]
+    return create_access_token(subject), create_refresh_token(subject, family=payload["fam"])
+
+
+def revoke_refresh_token(refresh_token: str) -> bool:
+    """
+    Revoga a sessão do refresh token (logout); False se o token for inválido
+    """
+    payload = _decode_refresh_token(refresh_token)
+    if payload is None:
+        return False
+    get_revocation_store().revoke(f"fam:{payload['fam']}", time.time() + settings.REFRESH_TOKEN_EXPIRE_DAYS * 86400)
+    return True
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verifica se a senha em texto plano corresponde ao hash
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
     Gera hash da senha
     """
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
+
+
+class PasswordHashExecutor:
+    """
+    Pool limitado de threads para bcrypt, com métricas de fila
+
+    O bcrypt libera o GIL, então as threads rodam em paralelo sem bloquear o
+    event loop nem ocupar o threadpool geral do FastAPI.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.peak_queued = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    def _run(self, submitted_at: float, function, *args):
+        started_at = time.perf_counter()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            self._wait_total += started_at - submitted_at
+        try:
+            return function(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self._run_total += time.perf_counter() - started_at
+
+    async def run(self, function, *args):
+        with self._lock:
+            self.queued += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._run, time.perf_counter(), function, *args)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            completed = self.completed or 1
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "peak_queued": self.peak_queued,
+                "wait_ms_avg": self._wait_total / completed * 1000,
+                "hash_ms_avg": self._run_total / completed * 1000,
+            }
+
+
+@lru_cache()
+def get_password_executor() -> PasswordHashExecutor:
+    """
+    Pool de bcrypt, criado no primeiro hash (importar o módulo não lê o .env nem cria threads)
+    """
+    return PasswordHashExecutor(settings.PASSWORD_HASH_WORKERS)
+
+
+def __getattr__(name):
+    # Compatibilidade com `from .security import pwd_context, token_cache, password_executor`
+    if name == "pwd_context":
+        return get_pwd_context()
+    if name == "token_cache":
+        return get_token_cache()
+    if name == "password_executor":
+        return get_password_executor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """
+    Versão assíncrona de verify_password, executada no pool de bcrypt
+    """
+    return await get_password_executor().run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """
+    Versão assíncrona de get_password_hash, executada no pool de bcrypt
+    """
+    return await get_password_executor().run(get_password_hash, password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> Tuple[bool, Optional[str]]:
+    """
+    Verifica a senha no login e devolve um novo hash se o custo configurado mudou
+    (o chamador deve salvar o novo hash em users.password_hash)
+    """
+    return await get_password_executor().run(get_pwd_context().verify_and_update, plain_password, hashed_password)
+
+
+def calibrate_bcrypt_rounds(target_ms: float = 250.0, min_rounds: int = 10, max_rounds: int = 16, samples: int = 3) -> dict:
+    """
+    Maior custo do bcrypt cujo hash fica dentro de `target_ms` neste hardware
+    """
+    timings = {}
+    selected = min_rounds
+    for rounds in range(min_rounds, max_rounds + 1):
+        hasher = get_pwd_context().handler("bcrypt").using(rounds=rounds)
+        durations = []
+        for _ in range(samples):
+            start = time.perf_counter()
+            hasher.hash("calibracao-bcrypt")
+            durations.append((time.perf_counter() - start) * 1000)
+        timings[rounds] = statistics.median(durations)
+        if timings[rounds] > target_ms:
+            break
+        selected = rounds
+    return {"rounds": selected, "target_ms": target_ms, "timings_ms": timings}
+
+
+def decode_token(token: str) -> dict:
+    """
+    Decodifica e valida assinatura/exp do token (PyJWT se instalado, senão python-jose)
+    """
+    if pyjwt is not None:
+        return pyjwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
 
 
 def verify_token(token: str) -> Optional[str]:
     """
     Verifica e decodifica um token JWT
     """
-    try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            return None
+    username = get_token_cache().get(token)
+    if username is not None:
         return username
-    except JWTError:
+
+    try:
+        payload = decode_token(token)
+    except TOKEN_DECODE_ERRORS:
+        return None
+
+    username = payload.get("sub")
+    if username is None or payload.get("type") == "refresh":
         return None
+    if payload.get("exp") is not None:
+        get_token_cache().set(token, username, float(payload["exp"]))
+    return username
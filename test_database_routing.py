@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Testes do roteamento de leituras para réplicas (RoutingSession em app/core/database.py)
+
+Usa dois arquivos SQLite, um como primário e outro como réplica, cada um com
+uma linha diferente na tabela `origin`: a linha lida mostra para onde a
+sessão enviou a consulta.
+
+Uso:
+    pytest test_database_routing.py -v
+"""
+import json
+import sqlite3
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+
+# Adicionar o diretório backend ao Python path
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.core import config, database
+from location_search import dialect_name
+
+
+@pytest.fixture
+def routing_db(tmp_path, monkeypatch):
+    """Primário e réplica com conteúdos distintos; engines recriados para o teste"""
+    urls = {}
+    for name in ("PRIMARY", "REPLICA"):
+        path = tmp_path / f"{name.lower()}.db"
+        conn = sqlite3.connect(path)
+        conn.execute("CREATE TABLE origin (name TEXT)")
+        conn.execute("INSERT INTO origin VALUES (?)", (name,))
+        conn.commit()
+        conn.close()
+        urls[name] = f"sqlite:///{path}"
+
+    monkeypatch.setenv("DATABASE_URL", urls["PRIMARY"])
+    monkeypatch.setenv("DATABASE_REPLICA_URLS", json.dumps([urls["REPLICA"]]))
+    monkeypatch.setenv("DB_POOL_LIVENESS", "none")
+    config.get_settings.cache_clear()
+    monkeypatch.setattr(database, "_engine", None)
+    monkeypatch.setattr(database, "_replica_engines", [])
+    monkeypatch.setattr(database, "_replica_cycle", None)
+
+    db = database.SessionLocal()
+    yield db
+    db.close()
+    for engine in [database._engine] + database._replica_engines:
+        if engine is not None:
+            engine.dispose()
+    config.get_settings.cache_clear()
+
+
+def read_origin(db) -> str:
+    return db.execute(text("SELECT name FROM origin")).scalar()
+
+
+def test_reads_go_to_replica(routing_db):
+    assert read_origin(routing_db) == "REPLICA"
+
+
+def test_read_after_dialect_probe_still_goes_to_replica(routing_db):
+    """dialect_name() chama db.get_bind() sem instrução; isso não pode fixar o primário"""
+    assert read_origin(routing_db) == "REPLICA"
+    assert dialect_name(routing_db) == "sqlite"
+    assert read_origin(routing_db) == "REPLICA"
+
+
+def test_write_pins_session_to_primary(routing_db):
+    routing_db.execute(text("UPDATE origin SET name = name"))
+    assert read_origin(routing_db) == "PRIMARY"
+
+
+def test_select_for_update_goes_to_primary(routing_db):
+    assert not database.RoutingSession._is_read(text("SELECT name FROM origin FOR UPDATE"))
+    assert database.RoutingSession._is_read(text("SELECT name FROM origin"))
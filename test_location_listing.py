@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Testes da listagem de locações (location_listing.py): consultas por requisição,
+relações de `include=` e paginação por cursor
+
+Monta uma base SQLite temporária com 600 locações, tags, fotos e
+fornecedores; o número de consultas precisa ser o mesmo para páginas de 1 ou
+500 linhas (sem N+1).
+
+Uso:
+    pytest test_location_listing.py -v
+"""
+import random
+from datetime import datetime, timedelta
+from itertools import combinations
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from check_location_listing_queries import check_relations, count_queries, expected_queries
+from location_listing import INCLUDES, list_locations, setup_listing_indexes
+
+LOCATIONS = 600
+SCHEMA = [
+    """CREATE TABLE suppliers (
+        id INTEGER PRIMARY KEY, name TEXT, email TEXT, phone TEXT, website TEXT, rating REAL
+    )""",
+    """CREATE TABLE locations (
+        id INTEGER PRIMARY KEY, title TEXT, slug TEXT, summary TEXT, description TEXT, status TEXT,
+        city TEXT, state TEXT, neighborhood TEXT, sector_type TEXT, space_type TEXT,
+        price_day_cinema REAL, capacity INTEGER, cover_photo_url TEXT, supplier_id INTEGER,
+        created_at TEXT, updated_at TEXT
+    )""",
+    "CREATE TABLE tags (id INTEGER PRIMARY KEY, name TEXT, kind TEXT, color TEXT)",
+    "CREATE TABLE location_tags (location_id INTEGER, tag_id INTEGER)",
+    """CREATE TABLE location_photos (
+        id INTEGER PRIMARY KEY, location_id INTEGER, url TEXT, thumbnail_path TEXT, caption TEXT,
+        width INTEGER, height INTEGER, is_primary BOOLEAN, sort_order INTEGER
+    )""",
+]
+
+
+@pytest.fixture(scope="module")
+def listing_db(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('listing') / 'listing.db'}")
+    rng = random.Random(7)
+    start = datetime(2024, 1, 1)
+    with engine.begin() as conn:
+        for statement in SCHEMA:
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql(
+            "INSERT INTO suppliers VALUES (?, ?, ?, ?, ?, ?)",
+            [(i, f"Fornecedor {i}", f"f{i}@example.com", None, None, 4.5) for i in range(1, 11)],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO tags VALUES (?, ?, ?, ?)",
+            [(i, f"tag {i}", "feature", "#000000") for i in range(1, 21)],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO locations (id, title, slug, status, city, state, price_day_cinema, capacity, "
+            "supplier_id, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (i, f"Locação {i}", f"locacao-{i}", "approved", rng.choice(["Rio", "São Paulo"]), "RJ",
+                 rng.choice([None, 1500.0, 3000.0]), rng.randint(10, 300),
+                 rng.choice([None] + list(range(1, 11))),
+                 # Datas repetidas: o cursor precisa do id para desempatar
+                 (start + timedelta(hours=i // 3)).isoformat(sep=" "), start.isoformat(sep=" "))
+                for i in range(1, LOCATIONS + 1)
+            ],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO location_tags VALUES (?, ?)",
+            [(i, tag) for i in range(1, LOCATIONS + 1) for tag in rng.sample(range(1, 21), rng.randint(0, 3))],
+        )
+        conn.exec_driver_sql(
+            "INSERT INTO location_photos (location_id, url, is_primary, sort_order) VALUES (?, ?, ?, ?)",
+            [
+                (i, f"https://example.com/{i}/{n}.jpg", n == 2 and i % 2 == 0, n)
+                for i in range(1, LOCATIONS + 1) for n in range(rng.randint(0, 3))
+            ],
+        )
+    db = Session(engine)
+    setup_listing_indexes(db)
+    yield db
+    db.close()
+    engine.dispose()
+
+
+@pytest.mark.parametrize("use_cursor", [False, True])
+@pytest.mark.parametrize(
+    "include", [combo for size in range(len(INCLUDES) + 1) for combo in combinations(INCLUDES, size)]
+)
+def test_query_count_does_not_grow_with_page_size(listing_db, include, use_cursor):
+    cursor = list_locations(listing_db, limit=1)["next_cursor"] if use_cursor else None
+    counts = []
+    for page_size in (1, 24, 500):
+        with count_queries(listing_db.get_bind()) as statements:
+            list_locations(listing_db, limit=page_size, cursor=cursor, include=",".join(include))
+        counts.append(len(statements))
+    assert counts == [expected_queries(include, use_cursor)] * 3
+
+
+def test_includes_match_row_by_row_loading(listing_db):
+    page = list_locations(listing_db, limit=200, include=",".join(INCLUDES))
+    assert len(page["items"]) == 200
+    assert check_relations(listing_db, page["items"]) == []
+
+
+def test_cursor_pages_cover_every_location_once(listing_db):
+    seen, cursor = [], None
+    while True:
+        page = list_locations(listing_db, limit=70, cursor=cursor, fields="title")
+        seen += [item["id"] for item in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert sorted(seen) == list(range(1, LOCATIONS + 1))
+    assert len(seen) == len(set(seen))
+
+
+def test_fields_restricts_columns(listing_db):
+    page = list_locations(listing_db, limit=5, fields="title,city", sort="-created_at")
+    assert all(set(item) == {"id", "title", "city"} for item in page["items"])
+
+
+def test_unknown_include_is_rejected(listing_db):
+    with pytest.raises(ValueError):
+        list_locations(listing_db, include="photos")
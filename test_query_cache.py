@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Testes da invalidação por tags do QueryCache (app/core/cache.py)
+
+Usa um Redis em memória (FakeRedis abaixo) que pode ser "derrubado" para
+simular a queda: dois QueryCache sobre o mesmo FakeRedis fazem o papel de
+dois workers da API.
+
+Uso:
+    pytest test_query_cache.py -v
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+# Adicionar o diretório backend ao Python path
+backend_dir = Path(__file__).parent / "backend"
+sys.path.insert(0, str(backend_dir))
+
+from app.core.cache import MISS, QueryCache
+
+
+class FakeRedis:
+    """Subconjunto dos comandos usados pelo QueryCache; down=True faz tudo falhar"""
+
+    def __init__(self):
+        self.data = {}
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            raise ConnectionError("redis fora do ar")
+
+    async def get(self, key):
+        self._check()
+        return self.data.get(key)
+
+    async def mget(self, keys):
+        self._check()
+        return [self.data.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None, px=None, nx=False):
+        self._check()
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        return True
+
+    async def delete(self, key):
+        self._check()
+        self.data.pop(key, None)
+
+    async def incr(self, key):
+        self._check()
+        self.data[key] = str(int(self.data.get(key) or 0) + 1)
+        return int(self.data[key])
+
+
+def make_cache(redis):
+    # retry_interval=0: a chamada seguinte à falha já tenta o Redis de novo
+    return QueryCache(client=redis, retry_interval=0)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_invalidate_changes_key_for_every_worker():
+    redis = FakeRedis()
+    worker_a, worker_b = make_cache(redis), make_cache(redis)
+
+    async def scenario():
+        key_before = await worker_b.make_key("locations:list", {"page": 1}, ["locations"])
+        await worker_a.invalidate("locations")
+        key_after = await worker_b.make_key("locations:list", {"page": 1}, ["locations"])
+        return key_before, key_after
+
+    key_before, key_after = run(scenario())
+    assert key_before != key_after
+
+
+def test_other_tags_keep_their_keys():
+    redis = FakeRedis()
+    cache = make_cache(redis)
+
+    async def scenario():
+        key_before = await cache.make_key("tags:list", {}, ["tags"])
+        await cache.invalidate("locations")
+        return key_before, await cache.make_key("tags:list", {}, ["tags"])
+
+    key_before, key_after = run(scenario())
+    assert key_before == key_after
+
+
+def test_get_or_set_reloads_after_invalidation():
+    cache = make_cache(FakeRedis())
+    loads = []
+
+    async def load():
+        loads.append(1)
+        return {"items": len(loads)}
+
+    async def scenario():
+        first = await cache.get_or_set("locations:list", {"page": 1}, load, tags=["locations"])
+        cached = await cache.get_or_set("locations:list", {"page": 1}, load, tags=["locations"])
+        await cache.invalidate("locations")
+        reloaded = await cache.get_or_set("locations:list", {"page": 1}, load, tags=["locations"])
+        return first, cached, reloaded
+
+    first, cached, reloaded = run(scenario())
+    assert first == cached == {"items": 1}
+    assert reloaded == {"items": 2}
+    assert len(loads) == 2
+
+
+def test_invalidation_during_outage_reaches_redis_on_recovery():
+    redis = FakeRedis()
+    worker_a, worker_b = make_cache(redis), make_cache(redis)
+
+    async def scenario():
+        key_before = await worker_b.make_key("locations:list", {"page": 1}, ["locations"])
+        redis.down = True
+        await worker_a.invalidate("locations")
+        assert worker_a._pending_tags == {"locations"}
+        redis.down = False
+        # Primeira chamada bem-sucedida do worker A envia o INCR pendente
+        assert await worker_a.get("qualquer-chave") is MISS
+        key_after = await worker_b.make_key("locations:list", {"page": 1}, ["locations"])
+        return key_before, key_after
+
+    key_before, key_after = run(scenario())
+    assert key_before != key_after
+    assert worker_a._pending_tags == set()
+
+
+def test_local_fallback_when_redis_is_down():
+    redis = FakeRedis()
+    cache = make_cache(redis)
+    redis.down = True
+
+    async def scenario():
+        key = await cache.make_key("locations:list", {"page": 1}, ["locations"])
+        await cache.set(key, {"items": 1})
+        return key, await cache.get(key)
+
+    key, value = run(scenario())
+    assert value == {"items": 1}
+    assert cache.local.get(key) == {"items": 1}
+    assert cache.stats["redis_errors"] > 0
+
+
+def test_invalidate_without_redis_only_bumps_local_versions():
+    cache = QueryCache()
+
+    async def scenario():
+        key_before = await cache.make_key("locations:list", {}, ["locations"])
+        await cache.invalidate("locations")
+        return key_before, await cache.make_key("locations:list", {}, ["locations"])
+
+    key_before, key_after = run(scenario())
+    assert key_before != key_after
+    assert cache._pending_tags == set()
+    assert run(cache.get("ausente")) is MISS
+
+
+class FakeSyncRedis:
+    """Cliente síncrono (pipeline) sobre os mesmos dados do FakeRedis"""
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self.commands = []
+
+    def pipeline(self):
+        self.commands = []
+        return self
+
+    def incr(self, key):
+        self.commands.append(key)
+
+    def execute(self):
+        self.redis._check()
+        for key in self.commands:
+            self.redis.data[key] = str(int(self.redis.data.get(key) or 0) + 1)
+
+
+def test_invalidate_sync_outage_is_flushed_on_next_commit():
+    redis = FakeRedis()
+    cache = QueryCache(client=redis, sync_client=FakeSyncRedis(redis), retry_interval=0)
+
+    redis.down = True
+    cache.invalidate_tables(["tags"])
+    assert cache._pending_tags == {"tags", "locations"}
+
+    redis.down = False
+    cache.invalidate_tables(["suppliers"])
+    assert cache._pending_tags == set()
+    assert redis.data == {
+        "cinema:cache:tag:locations": "1",
+        "cinema:cache:tag:suppliers": "1",
+        "cinema:cache:tag:tags": "1",
+    }
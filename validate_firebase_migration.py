@@ -200,19 +200,9 @@ class FirebaseMigrationValidator:
 
             for collection_name in collections_to_check:
                 try:
-                    # Contar documentos na coleção
-                    docs = await self.firestore_adapter.list_documents(
-                        collection_name,
-                        limit=1  # Só para verificar se existe
-                    )
-
-                    # Contar todos os documentos
-                    all_docs = await self.firestore_adapter.list_documents(
-                        collection_name
-                    )
-
-                    count = len(all_docs) if all_docs else 0
-                    collection_data[collection_name] = count
+                    # Contar documentos na coleção sem baixar os documentos
+                    count = await self.firestore_adapter.count_documents(collection_name)
+                    collection_data[collection_name] = count or 0
 
                 except Exception:
                     collection_data[collection_name] = 0